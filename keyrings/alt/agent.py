@@ -0,0 +1,155 @@
+"""
+A key agent holding the keys of unlocked encrypted keyrings, so other
+processes can use them without prompting for the password.
+
+Start the agent with::
+
+    python -m keyrings.alt.agent ~/.keyring-agent.sock --timeout 900 &
+
+and point the keyrings at its socket, for example with
+``KEYRING_PROPERTY_AGENT_SOCKET=~/.keyring-agent.sock``. The first
+process to unlock a keyring leaves the key derived from its password with
+the agent, and later processes ask the agent before prompting. The
+password itself is never sent to the agent.
+
+The socket is only accessible to its owner. The agent keeps the keys in
+memory only and exits, forgetting them, once no request arrived for
+`timeout` seconds.
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+
+from . import file_base
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """
+    Answer a single request, a JSON object on one line.
+    """
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            response = getattr(self, 'do_' + request.pop('op'))(**request)
+        except (ValueError, TypeError, KeyError, AttributeError) as exc:
+            response = dict(error=str(exc))
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+    def do_get(self, file):
+        return dict(key=self.server.keys.get(file))
+
+    def do_put(self, file, key):
+        self.server.keys[file] = key
+        return {}
+
+    def do_forget(self, file):
+        self.server.keys.pop(file, None)
+        return {}
+
+    def do_stop(self):
+        self.server.done = True
+        return {}
+
+
+class Agent(socketserver.UnixStreamServer):
+    """
+    Serve the keys on a Unix socket at path until stopped or idle for
+    timeout seconds.
+    """
+
+    def __init__(self, path, timeout=900):
+        # create the socket inaccessible to others from the start
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, Handler)
+        finally:
+            os.umask(umask)
+        self.timeout = timeout
+        self.keys = {}
+        self.done = False
+
+    def handle_timeout(self):
+        self.done = True
+
+    def serve(self):
+        try:
+            while not self.done:
+                self.handle_request()
+        finally:
+            self.server_close()
+            os.remove(self.server_address)
+
+
+class Client:
+    """
+    Talk to the agent listening at path.
+
+    Requests fail quietly, returning None, when no agent is listening.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+
+    def _request(self, **request):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(self.path)
+                sock.sendall(json.dumps(request).encode() + b'\n')
+                with sock.makefile('rb') as response:
+                    return json.loads(response.readline())
+        except (OSError, ValueError):
+            return None
+
+    def get(self, file):
+        """
+        Return the salt, key derivation and key held for the keyring file,
+        or None.
+        """
+        response = self._request(op='get', file=os.path.realpath(file))
+        held = response and response.get('key')
+        if not held:
+            return None
+        salt, kdf, key = held
+        return base64.b64decode(salt), kdf, base64.b64decode(key)
+
+    def put(self, file, salt, kdf, key):
+        """
+        Leave the salt, key derivation and key of the keyring file with
+        the agent.
+        """
+        held = file_base._encode(salt), kdf, file_base._encode(key)
+        self._request(op='put', file=os.path.realpath(file), key=held)
+
+    def forget(self, file):
+        """
+        Make the agent forget the key of the keyring file.
+        """
+        self._request(op='forget', file=os.path.realpath(file))
+
+    def stop(self):
+        """
+        Stop the agent.
+        """
+        self._request(op='stop')
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('socket', help="path of the socket to listen on")
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=900,
+        help="seconds without requests after which to exit (default: %(default)s)",
+    )
+    options = parser.parse_args(args)
+    Agent(os.path.expanduser(options.socket), options.timeout).serve()
+
+
+if __name__ == '__main__':
+    main()
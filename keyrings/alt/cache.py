@@ -0,0 +1,75 @@
+"""
+A small in-memory cache with size and age limits.
+"""
+
+import collections
+import threading
+import time
+
+
+class Cache:
+    """
+    Hold at most max_size items, each for at most ttl seconds, evicting
+    the least recently used item first. Count hits and misses.
+
+    A max_size of 0 disables the cache.
+
+    >>> cache = Cache(max_size=2, ttl=60)
+    >>> cache.put('a', 1)
+    >>> cache.get('a'), cache.get('b')
+    (1, None)
+    >>> cache.stats()
+    {'hits': 1, 'misses': 1, 'size': 1}
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        """
+        Return the value held for key, or None.
+        """
+        with self._lock:
+            expires, value = self._items.get(key, (None, None))
+            if expires is not None and expires < time.monotonic():
+                del self._items[key]
+                value = None
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Hold value for key, evicting the least recently used items
+        beyond max_size.
+        """
+        if not self:
+            return
+        with self._lock:
+            self._items[key] = time.monotonic() + self.ttl, value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Evict all items.
+        """
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """
+        Return the hits, misses and current size.
+        """
+        return dict(hits=self.hits, misses=self.misses, size=len(self._items))
@@ -3,6 +3,7 @@ escape/unescape routines available for backends which need
 alphanumeric usernames, services, or other values
 """
 
+import functools
 import re
 import string
 
@@ -13,6 +14,9 @@ LEGAL_CHARS = (
 
 ESCAPE_FMT = "_%02X"
 
+MEMO_SIZE = 4096
+"Number of recently escaped and unescaped values remembered by each."
+
 
 def _escape_char(c):
     "Single char escape. Return the char, escaped if not already legal"
@@ -21,25 +25,47 @@ def _escape_char(c):
     return c if c in LEGAL_CHARS else ESCAPE_FMT % ord(c)
 
 
+# the escaped form of each byte, indexed by its value
+_ESCAPES = [_escape_char(byte) for byte in range(256)]
+
+# the byte each escape code stands for, with hex digits in either case
+_UNESCAPES = {
+    f'_{high}{low}'.encode('ascii'): bytes([int(high + low, 16)])
+    for high in string.hexdigits
+    for low in string.hexdigits
+}
+
+_ESCAPED = re.compile(ESCAPE_FMT.replace('%02X', '[0-9A-Fa-f]{2}').encode('ascii'))
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
 def escape(value):
     """
     Escapes given string so the result consists of alphanumeric chars and
     underscore only.
     """
-    return "".join(_escape_char(c) for c in value.encode('utf-8'))
+    # latin-1 maps each byte to the character of the same ordinal
+    return value.encode('utf-8').decode('latin-1').translate(_ESCAPES)
 
 
 def _unescape_code(regex_match):
-    ordinal = int(regex_match.group('code'), 16)
-    return bytes([ordinal])
+    return _UNESCAPES[regex_match.group()]
 
 
+@functools.lru_cache(maxsize=MEMO_SIZE)
 def unescape(value):
     """
     Inverse of escape.
     """
-    pattern = ESCAPE_FMT.replace('%02X', '(?P<code>[0-9A-Fa-f]{2})')
-    # the pattern must be bytes to operate on bytes
-    pattern_bytes = pattern.encode('ascii')
-    re_esc = re.compile(pattern_bytes)
-    return re_esc.sub(_unescape_code, value.encode('ascii')).decode('utf-8')
+    data = value.encode('ascii')
+    if b'\\' not in data:
+        # turned into \x escapes, the escape codes decode to the characters
+        # of the same ordinals as the bytes they stand for
+        try:
+            text = data.replace(b'_', b'\\x').decode('unicode_escape')
+        except UnicodeDecodeError:
+            # an underscore not starting an escape code
+            pass
+        else:
+            return text.encode('latin-1').decode('utf-8')
+    return _ESCAPED.sub(_unescape_code, data).decode('utf-8')
@@ -1,14 +1,56 @@
+import concurrent.futures
 import configparser
+import copy
+import functools
 import getpass
+import hashlib
+import hmac
 import json
+import math
 import os
 import sys
+import time
 
 from jaraco.classes import properties
 
-from keyrings.alt.file_base import Keyring, decodebytes, encodebytes
+from keyrings.alt.file_base import (
+    _READ_ONLY_ERRORS,
+    Keyring,
+    _encode,
+    _get_value,
+    decodebytes,
+    encodebytes,
+)
 
+from . import cache
 from .escape import escape as escape_for_ini
+from .escape import unescape
+
+KDF_PARAMS = {
+    'pbkdf2-sha1': ('iterations',),
+    'pbkdf2-sha256': ('iterations',),
+    'scrypt': ('n', 'r', 'p'),
+}
+"Cost parameters of each key derivation function."
+
+LEGACY_KDF = 'pbkdf2-sha1 iterations=1000'
+"Key derivation of files that don't record one."
+
+SCHEMES = '[PBKDF2] AES256.CFB', '[PBKDF2] AES256.GCM'
+"Encryption schemes of encrypted keyrings."
+
+ENVELOPE_CFB = 1
+ENVELOPE_GCM = 2
+ENVELOPE_GCM_AAD = 3
+"""
+Formats of encrypted entries, given by their first byte and followed by
+the salt, the IV or nonce, the encrypted password and, for GCM, the tag.
+GCM_AAD entries are bound to associated data. Entries starting with
+``{`` are in the JSON format of earlier versions.
+"""
+
+NONCE_SIZE = 12
+TAG_SIZE = 16
 
 
 class PlaintextKeyring(Keyring):
@@ -36,8 +78,22 @@ class Encrypted:
     """
 
     scheme = '[PBKDF2] AES256.CFB'
-    version = '1.0'
+    "Encryption scheme of new entries, one of `SCHEMES`."
+    version = '2.0'
     block_size = 32
+    salt_size = 16
+    "Size of the salt deriving the key of each entry from the master key."
+
+    kdf = 'pbkdf2-sha256'
+    "Key derivation function for new keyrings: pbkdf2-sha256 or scrypt."
+    kdf_iterations = 600_000
+    "PBKDF2 iteration count for new keyrings."
+    kdf_n = 2**15
+    "scrypt CPU/memory cost for new keyrings, a power of two."
+    kdf_r = 8
+    "scrypt block size for new keyrings."
+    kdf_p = 1
+    "scrypt parallelization for new keyrings."
 
     def __init__(self):
         vars(self).update(self._get_crypto_impl())
@@ -47,20 +103,97 @@ class Encrypted:
         try:
             import Cryptodome.Random as Random  # noqa: F401
             from Cryptodome.Cipher import AES  # noqa: F401
+            from Cryptodome.Hash import SHA256  # noqa: F401
             from Cryptodome.Protocol import KDF  # noqa: F401
         except ImportError:
             import Crypto.Random as Random  # noqa: F401
             from Crypto.Cipher import AES  # noqa: F401
+            from Crypto.Hash import SHA256  # noqa: F401
             from Crypto.Protocol import KDF  # noqa: F401
         return locals()
 
     def _create_cipher(self, password, salt, IV):
         """
-        Create the cipher object to encrypt or decrypt a payload.
+        Create the cipher object to encrypt or decrypt a payload, deriving
+        the key from the password (as in version 1.0 keyrings).
         """
         pw = self.KDF.PBKDF2(password, salt, dkLen=self.block_size)
         return self.AES.new(pw[: self.block_size], self.AES.MODE_CFB, IV)
 
+    def _kdf_setting(self):
+        """
+        Return the key derivation function and cost configured for new
+        keyrings, as recorded in the file, such as
+        ``scrypt n=32768 r=8 p=1``.
+        """
+        try:
+            names = KDF_PARAMS[self.kdf]
+        except KeyError:
+            raise ValueError(f"Unknown key derivation function {self.kdf}")
+        params = (f'{name}={int(getattr(self, "kdf_" + name))}' for name in names)
+        return ' '.join([self.kdf, *params])
+
+    def _derive_key(self, password, salt, kdf=LEGACY_KDF):
+        """
+        Derive the master key from the password and the salt of the file
+        with the key derivation function and cost recorded as kdf.
+        """
+        name, *params = kdf.split()
+        params = {key: int(value) for key, value in (p.split('=') for p in params)}
+        if name == 'scrypt':
+            return self.KDF.scrypt(
+                password, salt, self.block_size, params['n'], params['r'], params['p']
+            )
+        hashes = {'pbkdf2-sha1': None, 'pbkdf2-sha256': self.SHA256}
+        if name not in hashes:
+            raise ValueError(f"Unknown key derivation function {name}")
+        return self.KDF.PBKDF2(
+            password,
+            salt,
+            dkLen=self.block_size,
+            count=params['iterations'],
+            hmac_hash_module=hashes[name],
+        )
+
+    def calibrate(self, target=0.1):
+        """
+        Measure this host and set the cost of `kdf` so that deriving the
+        key of a keyring takes about target seconds. Return the resulting
+        key derivation setting.
+
+        The cost applies to keyrings created (or upgraded) afterwards.
+        """
+        param = 'n' if self.kdf == 'scrypt' else 'iterations'
+        setattr(self, 'kdf_' + param, 2**10)
+        salt = self.Random.get_random_bytes(self.block_size)
+        while True:
+            start = time.perf_counter()
+            self._derive_key('calibration', salt, self._kdf_setting())
+            elapsed = time.perf_counter() - start
+            if elapsed > target / 2:
+                break
+            setattr(self, 'kdf_' + param, getattr(self, 'kdf_' + param) * 2)
+        cost = getattr(self, 'kdf_' + param) * target / elapsed
+        if param == 'n':
+            # scrypt requires a power of two
+            cost = 2 ** max(1, round(math.log2(cost)))
+        setattr(self, 'kdf_' + param, max(1, int(cost)))
+        return self._kdf_setting()
+
+    def _create_entry_cipher(self, key, salt, IV, mode='CFB'):
+        """
+        Create the cipher object to encrypt or decrypt a payload, deriving
+        the key of the entry from the master key and the entry's salt.
+        """
+        entry_key = self._entry_key(key, salt)
+        return self.AES.new(entry_key, getattr(self.AES, 'MODE_' + mode), IV)
+
+    def _entry_key(self, key, salt):
+        """
+        Derive the key of an entry from the master key and its salt.
+        """
+        return self.KDF.HKDF(key, self.block_size, salt, self.SHA256)
+
     def _get_new_password(self):
         while True:
             password = getpass.getpass("Please set a password for your new keyring: ")
@@ -81,6 +214,67 @@ class EncryptedKeyring(Encrypted, Keyring):
     filename = 'crypted_pass.cfg'
     pw_prefix = b'pw:'
 
+    agent_socket = None
+    """
+    Path to the socket of a running `keyrings.alt.agent`, to unlock
+    without prompting when the agent holds the key.
+    """
+
+    key_cache_size = 0
+    "Number of entry keys to keep in memory, by salt; 0 disables the cache."
+    plaintext_cache_size = 0
+    """
+    Number of decrypted passwords to keep in memory, by digest of the
+    encrypted password; 0 disables the cache.
+    """
+    cache_ttl = 300.0
+    "Seconds to keep an entry key or decrypted password in memory."
+
+    bulk_workers = 0
+    """
+    Number of workers encrypting and decrypting in parallel in bulk
+    operations, such as `get_passwords` and `export_all`; 0 works in
+    the calling thread.
+    """
+    bulk_executor = 'thread'
+    "Kind of workers for bulk operations: thread or process."
+
+    _header = None
+    "The keyring-setting section, as pinned in copies sent to workers."
+
+    _hidden_sections = frozenset([escape_for_ini('keyring-setting')])
+
+    _master = None
+    """
+    The password, salt and KDF the master key was derived from, and the
+    key. The password is None for a key held by the agent.
+    """
+
+    @properties.NonDataProperty
+    def _key_cache(self):
+        self._key_cache = cache.Cache(int(self.key_cache_size), float(self.cache_ttl))
+        return self._key_cache
+
+    @properties.NonDataProperty
+    def _plaintext_cache(self):
+        self._plaintext_cache = cache.Cache(
+            int(self.plaintext_cache_size), float(self.cache_ttl)
+        )
+        return self._plaintext_cache
+
+    def cache_stats(self):
+        """
+        Return the hits, misses and sizes of the entry key and plaintext
+        caches.
+        """
+        return dict(
+            keys=self._key_cache.stats(), plaintexts=self._plaintext_cache.stats()
+        )
+
+    def _clear_caches(self):
+        self._key_cache.clear()
+        self._plaintext_cache.clear()
+
     @properties.classproperty
     def priority(cls):
         "Applicable for all platforms, but not recommended."
@@ -96,23 +290,119 @@ class EncryptedKeyring(Encrypted, Keyring):
     def keyring_key(self):
         # _unlock or _init_file will set the key or raise an exception
         if self._check_file():
+            if self._agent_unlock():
+                return self.keyring_key
             self._unlock()
         else:
             self._init_file()
+        self._agent_store()
         return self.keyring_key
 
+    def _agent_unlock(self):
+        """
+        Unlock this keyring with the key held by the agent, if any. The
+        password stays unknown, so `keyring_key` is None.
+
+        Return True if unlocked.
+        """
+        if self.agent_socket is None:
+            return False
+        from . import agent
+
+        held = agent.Client(self.agent_socket).get(self.file_path)
+        if held is None:
+            return False
+        salt, kdf, key = held
+        salt_setting = self._setting('salt')
+        if salt_setting is None or (salt, kdf) != (
+            decodebytes(salt_setting.encode()),
+            self._setting('kdf') or LEGACY_KDF,
+        ):
+            # the key of a previous version of the file
+            return False
+        self.keyring_key = None
+        self._master = None, salt, kdf, key
+        try:
+            self._check_key()
+        except ValueError:
+            self._lock()
+            return False
+        return True
+
+    def _agent_store(self):
+        """
+        Leave the key of this unlocked keyring with the agent.
+        """
+        if self.agent_socket is None or self._master is None:
+            return
+        from . import agent
+
+        _, salt, kdf, key = self._master
+        agent.Client(self.agent_socket).put(self.file_path, salt, kdf, key)
+
     def _init_file(self):
         """
         Initialize a new password file and set the reference password.
         """
         self.keyring_key = self._get_new_password()
-        # set a reference password, used to check that the password provided
-        #  matches for subsequent checks.
-        self.set_password(
-            'keyring-setting', 'password reference', 'password reference value'
-        )
+        with self.transaction():
+            self._write_header()
+            # set a reference password, used to check that the password
+            #  provided matches for subsequent checks.
+            self.set_password(
+                'keyring-setting', 'password reference', 'password reference value'
+            )
+
+    def _write_header(self):
+        """
+        Write the scheme and version of the file, a new salt and the key
+        derivation for the master key, and the check value of the key.
+        """
+        salt = self.Random.get_random_bytes(self.block_size)
         self._write_config_value('keyring-setting', 'scheme', self.scheme)
         self._write_config_value('keyring-setting', 'version', self.version)
+        self._write_config_value('keyring-setting', 'salt', _encode(salt))
+        self._write_config_value('keyring-setting', 'kdf', self._kdf_setting())
+        self._write_config_value('keyring-setting', 'check', _encode(self._key_check()))
+
+    def _key_check(self):
+        """
+        Return the check value of the master key, which verifies the
+        password without decrypting any entry.
+        """
+        return self.KDF.HKDF(
+            self._master_key(), self.block_size, b'', self.SHA256, context=b'check'
+        )
+
+    def _check_key(self):
+        """
+        Check the keyring key against the file, raising ValueError if it
+        is incorrect.
+        """
+        check = self._setting('check')
+        if check is not None:
+            if not hmac.compare_digest(decodebytes(check.encode()), self._key_check()):
+                raise ValueError("Incorrect Password")
+            return
+        # files without a check value have their password reference decrypted
+        try:
+            ref_pw = self.get_password('keyring-setting', 'password reference')
+            assert ref_pw == 'password reference value'
+        except (AssertionError, ValueError):
+            # an authenticated entry rejects the wrong key with ValueError
+            raise ValueError("Incorrect Password")
+
+    def _setting(self, name):
+        """
+        Return the value of name in the keyring-setting section, or None.
+        """
+        if self._header is not None:
+            return self._header.get(name)
+        return _get_value(
+            self._load_config(),
+            escape_for_ini('keyring-setting'),
+            escape_for_ini(name),
+        )
 
     def _check_file(self):
         """
@@ -121,8 +411,7 @@ class EncryptedKeyring(Encrypted, Keyring):
         if not os.path.exists(self.file_path):
             return False
         self._migrate()
-        config = configparser.RawConfigParser()
-        config.read(self.file_path, encoding='utf-8')
+        config = self._load_config()
         try:
             config.get(
                 escape_for_ini('keyring-setting'), escape_for_ini('password reference')
@@ -154,7 +443,8 @@ class EncryptedKeyring(Encrypted, Keyring):
         if scheme.startswith('PyCrypto '):
             scheme = scheme[9:]
 
-        if scheme != self.scheme:
+        # entries record their mode, so any known scheme will do
+        if scheme not in SCHEMES:
             raise ValueError(
                 f"Encryption scheme mismatch (exp.: {self.scheme}, found: {scheme})"
             )
@@ -183,37 +473,139 @@ class EncryptedKeyring(Encrypted, Keyring):
             'Please enter password for encrypted keyring: '
         )
         try:
-            ref_pw = self.get_password('keyring-setting', 'password reference')
-            assert ref_pw == 'password reference value'
-        except AssertionError:
+            self._check_key()
+        except ValueError:
             self._lock()
-            raise ValueError("Incorrect Password")
+            raise
+        self._migrate(self.keyring_key)
 
     def _lock(self):
         """
-        Remove the keyring key from this instance.
+        Remove the keyring key, and anything derived from it, from this
+        instance.
         """
         del self.keyring_key
+        self._master = None
+        self._clear_caches()
+
+    def _master_key(self):
+        """
+        Return the master key, derived from the keyring password and the
+        salt of the file only once for as long as neither changes.
+        """
+        password = self.keyring_key
+        salt = decodebytes(self._setting('salt').encode())
+        kdf = self._setting('kdf') or LEGACY_KDF
+        if self._master is None or self._master[:3] != (password, salt, kdf):
+            if password is None:
+                # the agent's key is for an earlier salt; unlock anew
+                self._lock()
+                return self._master_key()
+            self._master = password, salt, kdf, self._derive_key(password, salt, kdf)
+            self._clear_caches()
+        return self._master[3]
+
+    def _entry_key(self, key, salt):
+        entry_key = self._key_cache.get(salt)
+        if entry_key is None:
+            entry_key = super()._entry_key(key, salt)
+            self._key_cache.put(salt, entry_key)
+        return entry_key
+
+    def _generate_assoc(self, service, username):
+        return self._assoc(escape_for_ini(service), escape_for_ini(username))
+
+    def _assoc(self, section, option):
+        # bind the username as stored, since usernames match
+        # case-insensitively in the file
+        return (section + r'\0' + option.lower()).encode()
 
     def encrypt(self, password, assoc=None):
+        key = self._master_key()
+        salt = self.Random.get_random_bytes(self.salt_size)
+        if self.scheme.endswith('.GCM'):
+            return self._encrypt_gcm(key, salt, password, assoc)
         # encrypt password, ignore associated data
-        salt = self.Random.get_random_bytes(self.block_size)
         IV = self.Random.get_random_bytes(self.AES.block_size)
-        cipher = self._create_cipher(self.keyring_key, salt, IV)
+        cipher = self._create_entry_cipher(key, salt, IV)
         password_encrypted = cipher.encrypt(self.pw_prefix + password)
-        # Serialize the salt, IV, and encrypted password in a secure format
-        data = dict(salt=salt, IV=IV, password_encrypted=password_encrypted)
-        for key in data:
-            # spare a few bytes: throw away newline from base64 encoding
-            data[key] = encodebytes(data[key]).decode()[:-1]
-        return json.dumps(data).encode()
+        return bytes([ENVELOPE_CFB]) + salt + IV + password_encrypted
+
+    def _encrypt_gcm(self, key, salt, password, assoc):
+        """
+        Encrypt password, authenticating it together with assoc.
+        """
+        nonce = self.Random.get_random_bytes(NONCE_SIZE)
+        cipher = self._create_entry_cipher(key, salt, nonce, mode='GCM')
+        if assoc is not None:
+            cipher.update(assoc)
+        password_encrypted, tag = cipher.encrypt_and_digest(password)
+        # the envelope marks whether assoc is bound, so decrypt needs no
+        # trial and error
+        envelope = ENVELOPE_GCM if assoc is None else ENVELOPE_GCM_AAD
+        return bytes([envelope]) + salt + nonce + password_encrypted + tag
 
     def decrypt(self, password_encrypted, assoc=None):
-        # unpack the encrypted payload, ignore associated data
+        if not self._plaintext_cache:
+            return self._decrypt(password_encrypted, assoc)
+        if self._master is not None and self._master[0] != self.keyring_key:
+            # the password changed; plaintexts cached under the old one
+            # must not answer for it
+            self._clear_caches()
+        # the same ciphertext may be bound to other associated data
+        digest = hashlib.sha256(password_encrypted).digest(), assoc
+        password = self._plaintext_cache.get(digest)
+        if password is None:
+            password = self._decrypt(password_encrypted, assoc)
+            self._plaintext_cache.put(digest, password)
+        return password
+
+    def _decrypt(self, password_encrypted, assoc):
+        if password_encrypted.startswith(b'{'):
+            return self._decrypt_json(password_encrypted)
+        envelope = password_encrypted[0]
+        salt = password_encrypted[1 : 1 + self.salt_size]
+        payload = password_encrypted[1 + self.salt_size :]
+        if envelope in (ENVELOPE_GCM, ENVELOPE_GCM_AAD):
+            return self._decrypt_gcm(salt, payload, assoc, envelope == ENVELOPE_GCM_AAD)
+        if envelope != ENVELOPE_CFB:
+            raise ValueError(f"Unknown entry format {envelope}")
+        # ignore associated data
+        IV = payload[: self.AES.block_size]
+        cipher = self._create_entry_cipher(self._master_key(), salt, IV)
+        plaintext = cipher.decrypt(payload[self.AES.block_size :])
+        assert plaintext.startswith(self.pw_prefix)
+        return plaintext[3:]
+
+    def _decrypt_gcm(self, salt, payload, assoc, aad):
+        """
+        Decrypt and authenticate payload, raising ValueError if it (or
+        the assoc bound to it) was tampered with.
+        """
+        if aad and assoc is None:
+            raise ValueError("Associated data required")
+        nonce = payload[:NONCE_SIZE]
+        cipher = self._create_entry_cipher(self._master_key(), salt, nonce, mode='GCM')
+        if aad:
+            cipher.update(assoc)
+        return cipher.decrypt_and_verify(
+            payload[NONCE_SIZE:-TAG_SIZE], payload[-TAG_SIZE:]
+        )
+
+    def _decrypt_json(self, password_encrypted):
+        """
+        Decrypt a payload in the JSON envelope of earlier versions,
+        ignoring associated data.
+        """
         data = json.loads(password_encrypted.decode())
         for key in data:
             data[key] = decodebytes(data[key].encode())
-        cipher = self._create_cipher(self.keyring_key, data['salt'], data['IV'])
+        if self._setting('version') in (None, '1.0'):
+            cipher = self._create_cipher(self.keyring_key, data['salt'], data['IV'])
+        else:
+            cipher = self._create_entry_cipher(
+                self._master_key(), data['salt'], data['IV']
+            )
         plaintext = cipher.decrypt(data['password_encrypted'])
         assert plaintext.startswith(self.pw_prefix)
         return plaintext[3:]
@@ -221,4 +613,235 @@ class EncryptedKeyring(Encrypted, Keyring):
     def _migrate(self, keyring_password=None):
         """
         Convert older keyrings to the current format.
+
+        A version 1.0 keyring derives the key of each entry from the
+        password, so upgrading it re-encrypts every entry and happens
+        once the password is known, on unlock. A keyring this user can't
+        write is left as it is and read as version 1.0.
+        """
+        if keyring_password is None or self._setting('version') not in (None, '1.0'):
+            return
+        entries = list(self._decrypt_entries())
+        try:
+            with self.transaction():
+                self._write_header()
+                self._update(self._encrypt_entries(entries))
+        except OSError as exc:
+            if exc.errno not in _READ_ONLY_ERRORS:
+                raise
+            # the master key derived for the header never made it to storage
+            self._master = None
+
+    def _decrypt_entries(self):
+        """
+        Yield the section, option and decrypted password of each entry.
+        """
+        items = self._encrypted_items(self._load_config())
+        for (section, option), password in self._parallel('decrypt', items):
+            yield section, option, password
+
+    def _encrypted_items(self, config):
+        """
+        Return the section and option, encrypted password and assoc of
+        each entry in config, as items for `_parallel`.
+        """
+        setting = escape_for_ini('keyring-setting')
+        reference = escape_for_ini('password reference').lower()
+        items = []
+        for section in config.sections():
+            for option in config.options(section):
+                if section == setting and option != reference:
+                    # not encrypted
+                    continue
+                value = decodebytes(config.get(section, option).encode())
+                items.append(((section, option), value, self._assoc(section, option)))
+        return items
+
+    def rekey(self, new_password):
+        """
+        Change the password of this keyring, re-encrypting every entry
+        under a new salt and the currently configured `kdf` and `scheme`.
+
+        Each entry is decrypted and re-encrypted in one step, in the
+        `bulk_workers`, and storage is rewritten only once all entries
+        are done, so an interrupted rekey leaves the keyring as it was,
+        under the old password. Writers wait for the rekey to complete.
+        """
+        if not new_password.strip():
+            raise ValueError("Blank passwords aren't allowed.")
+        if self._transaction is not None:
+            raise RuntimeError("Can't rekey in a transaction")
+        # unlock first, prompting if need be
+        self.keyring_key
+        target = copy.copy(self)
+        self._rewrite(functools.partial(self._rekey_changes, target, new_password))
+        self.keyring_key = new_password
+        self._master = target._master
+        self._clear_caches()
+        self._agent_store()
+
+    def _rekey_changes(self, target, new_password, config):
+        """
+        Re-encrypt the entries of config for target, a detached copy of
+        this keyring, under new_password. Return the changes to storage.
+        """
+        # the file may have changed since it was unlocked
+        self._check_key()
+        target.keyring_key = new_password
+        target._master = None
+        target._header = dict(
+            scheme=self.scheme,
+            version=self.version,
+            salt=_encode(self.Random.get_random_bytes(self.block_size)),
+            kdf=self._kdf_setting(),
+        )
+        target._header['check'] = _encode(target._key_check())
+        setting = escape_for_ini('keyring-setting')
+        changes = [
+            (setting, escape_for_ini(name), value)
+            for name, value in target._header.items()
+        ]
+        items = self._encrypted_items(config)
+        # the rewrite holds the lock on the storage, which thread workers
+        # would wait on to read the header, so pin it on a copy
+        source = copy.copy(self)
+        source._header = self._pinned_header()
+        changes.extend(
+            (section, option, '\n' + encodebytes(encrypted).decode())
+            for (section, option), encrypted in source._parallel(
+                '_reencrypt', items, target
+            )
+        )
+        return changes
+
+    def _reencrypt(self, password_encrypted, assoc, target):
+        return target.encrypt(self.decrypt(password_encrypted, assoc), assoc)
+
+    def _encrypt_entries(self, entries):
+        """
+        Encrypt and encode the passwords of entries as changes to the file.
         """
+        items = [
+            ((section, option), password, self._assoc(section, option))
+            for section, option, password in entries
+        ]
+        return [
+            (section, option, '\n' + encodebytes(encrypted).decode())
+            for (section, option), encrypted in self._parallel('encrypt', items)
+        ]
+
+    def _decode_passwords(self, values):
+        items = []
+        for (service, username), value in values:
+            if value is None:
+                yield (service, username), None
+                continue
+            assoc = self._generate_assoc(service, username)
+            items.append(((service, username), decodebytes(value.encode()), assoc))
+        for credential, password in self._parallel('decrypt', items):
+            yield credential, password.decode('utf-8')
+
+    def _encode_passwords(self, passwords):
+        items = []
+        for (service, username), password in passwords:
+            self._check_password(username, password)
+            assoc = self._generate_assoc(service, username)
+            items.append(((service, username), password.encode('utf-8'), assoc))
+        for credential, encrypted in self._parallel('encrypt', items):
+            yield credential, '\n' + encodebytes(encrypted).decode()
+
+    def export_all(self):
+        """
+        Yield the service, username and password of every entry, in the
+        order they are decrypted.
+        """
+        config = self._load_config()
+        setting = escape_for_ini('keyring-setting')
+        values = [
+            ((unescape(section), unescape(option)), config.get(section, option))
+            for section in config.sections()
+            if section != setting
+            for option in config.options(section)
+        ]
+        for (service, username), password in self._decode_passwords(values):
+            yield service, username, password
+
+    def _parallel(self, method, items, *args):
+        """
+        Apply the encrypt or decrypt method to items, triples of a key,
+        the data and its assoc, and any further args, in the configured
+        workers. Yield each key with the result as they complete.
+        """
+        workers = int(self.bulk_workers)
+        if workers < 1 or len(items) < 2:
+            yield from _crypt(self, method, items, *args)
+            return
+        executors = dict(
+            thread=concurrent.futures.ThreadPoolExecutor,
+            process=concurrent.futures.ProcessPoolExecutor,
+        )
+        # unlock and derive the master key before handing out the work
+        self._master_key()
+        size = -(-len(items) // (workers * 4))
+        with executors[self.bulk_executor](workers) as executor:
+            futures = [
+                executor.submit(
+                    _crypt, self, method, items[start : start + size], *args
+                )
+                for start in range(0, len(items), size)
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                yield from future.result()
+
+    def __getstate__(self):
+        # a detached copy for worker processes keeps the unlocked key and
+        # pins the header, leaving the crypto modules, caches and the
+        # state of the file behind
+        left = {'_key_cache', '_plaintext_cache', '_lock_state'}
+        left.update(['_config_cache', '_transaction'])
+        left.update(self._get_crypto_impl())
+        state = {name: value for name, value in vars(self).items() if name not in left}
+        state['_header'] = self._pinned_header()
+        return state
+
+    def _pinned_header(self):
+        """
+        Return the settings the key derives from, for a copy of this
+        keyring that doesn't read them from storage.
+        """
+        return {
+            name: self._setting(name) for name in ('version', 'salt', 'kdf', 'check')
+        }
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        vars(self).update(self._get_crypto_impl())
+
+    def import_file(self, path):
+        """
+        Copy the passwords from the encrypted INI keyring file at path,
+        such as ``crypted_pass.cfg``, into this keyring.
+
+        The source must use the same password. Its entries are
+        re-encrypted for this keyring; entries already in this keyring
+        are replaced.
+        """
+        source = EncryptedKeyring()
+        source.file_path = path
+        # unlocked by the agent, this keyring doesn't know the password
+        if self.keyring_key is not None:
+            source.keyring_key = self.keyring_key
+        source.bulk_workers = self.bulk_workers
+        source.bulk_executor = self.bulk_executor
+        source._check_key()
+        setting = escape_for_ini('keyring-setting')
+        self._update(
+            self._encrypt_entries(
+                entry for entry in source._decrypt_entries() if entry[0] != setting
+            )
+        )
+
+
+def _crypt(keyring, method, items, *args):
+    crypt = getattr(keyring, method)
+    return [(key, crypt(data, assoc, *args)) for key, data, assoc in items]
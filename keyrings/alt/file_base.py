@@ -1,14 +1,34 @@
 import abc
+import bisect
 import configparser
+import contextlib
+import errno
+import fnmatch
+import itertools
+import json
 import os
-from base64 import decodebytes, encodebytes
+import re
+import tempfile
+import threading
+import time
+from base64 import b64encode, decodebytes, encodebytes
 
 from jaraco.classes import properties
 from keyring.backend import KeyringBackend
+from keyring.credentials import SimpleCredential
 from keyring.errors import PasswordDeleteError
 from keyring.util import platform_
 
 from .escape import escape as escape_for_ini
+from .escape import unescape
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+_READ_ONLY_ERRORS = errno.EACCES, errno.EPERM, errno.EROFS
+"Errors creating the lock file that a read goes ahead without it on."
 
 
 class FileBacked:
@@ -47,6 +67,56 @@ class FileBacked:
         """
         return None
 
+    durability = 'file'
+    """
+    How far writes are flushed to disk: 'none' leaves it to the operating
+    system, 'file' syncs the file before it replaces the old one, and
+    'file+dir' also syncs the directory so the replacement itself survives
+    a crash.
+    """
+
+    @contextlib.contextmanager
+    def _replace_file(self, path, binary=False):
+        """
+        Open a temporary file for writing, which atomically replaces path
+        when the block completes. The temporary file is discarded if the
+        block raises, leaving path untouched.
+        """
+        path = os.path.realpath(path)
+        # mkstemp creates the file without group/world permissions
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=os.path.basename(path) + '.'
+        )
+        try:
+            mode, encoding = ('wb', None) if binary else ('w', 'utf-8')
+            with open(fd, mode, encoding=encoding) as tmp_file:
+                yield tmp_file
+                tmp_file.flush()
+                self._sync_file(tmp_file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._sync_dir(path)
+
+    def _sync_file(self, fd):
+        if self.durability not in ('none', 'file', 'file+dir'):
+            raise ValueError(f"Unknown durability policy {self.durability!r}")
+        if self.durability != 'none':
+            os.fsync(fd)
+
+    def _sync_dir(self, path):
+        """
+        Sync the directory containing path, where the platform allows it.
+        """
+        if self.durability != 'file+dir' or os.name == 'nt':
+            return
+        fd = os.open(os.path.dirname(path) or os.curdir, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
     def __repr__(self):
         tmpl = (
             "<{self.__class__.__name__} with {self.scheme} "
@@ -55,6 +125,18 @@ class FileBacked:
         return tmpl.format(**locals())
 
 
+class AlternativeStorage:
+    """
+    Mixin for keyrings storing passwords other than in the INI file of
+    the `keyrings.alt.file` keyring they derive from. They rank just below
+    that keyring, so keyring only uses them when configured to.
+    """
+
+    @properties.classproperty
+    def priority(cls):
+        return super().priority - 0.05
+
+
 class Keyring(FileBacked, KeyringBackend):
     """
     BaseKeyring is a file-based implementation of keyring.
@@ -63,8 +145,42 @@ class Keyring(FileBacked, KeyringBackend):
     which may be overridden by subclasses to support
     encryption and decryption. The encrypted payload is stored in base64
     format.
+
+    The parsed file is cached in memory and re-used for as long as the
+    file's identity (path, inode, size and modification time) is unchanged.
+
+    The keyring may be put in journal mode, in which changes are appended
+    to a journal next to the file rather than rewriting the whole file.
+    Reads replay the journal over the file, and the journal is folded back
+    into the file by `compact`, either explicitly or once it grows past
+    `journal_min_size` bytes and `journal_max_ratio` times the file size.
+
+    Where fcntl is available, access to the file is serialized across
+    processes with a lock on a file next to it: reads take a shared lock,
+    and read-modify-write cycles take an exclusive one. Reads go ahead
+    without the lock where the lock file can't be created.
     """
 
+    journal = False
+    "Append changes to a journal instead of rewriting the file."
+
+    journal_min_size = 64 * 1024
+    "Size in bytes below which the journal is never compacted automatically."
+
+    journal_max_ratio = 1.0
+    "Size of the journal, relative to the file, that triggers compaction."
+
+    lock_wait = 0.0
+    "Total time in seconds this keyring has spent waiting for the file lock."
+
+    _config_cache = None, None
+    _scanned_key = None
+    _transaction = None
+    _hidden_sections: frozenset[str] = frozenset()
+    "Escaped names of sections holding settings rather than passwords."
+    _section_index: tuple[object, list[str]] = None, []
+    "The config cache entry the sorted section names were taken from, and those."
+
     @abc.abstractmethod
     def encrypt(self, password, assoc=None):
         """
@@ -87,68 +203,448 @@ class Keyring(FileBacked, KeyringBackend):
         """
         Read the password from the file.
         """
-        assoc = self._generate_assoc(service, username)
-        service = escape_for_ini(service)
-        username = escape_for_ini(username)
+        value = self._read_value(escape_for_ini(service), escape_for_ini(username))
+        return self._decode_password(service, username, value)
 
-        # load the passwords from the file
-        config = configparser.RawConfigParser()
-        if os.path.exists(self.file_path):
-            config.read(self.file_path, encoding='utf-8')
+    def get_credential(self, service, username):
+        """
+        Return the credential for username of service or, if username is
+        None, for the first username of service, or None if not found.
+
+        Only the password returned is decrypted. Usernames are returned
+        as stored, with ASCII letters in lower case.
+        """
+        if username is not None:
+            return super().get_credential(service, username)
+        with contextlib.closing(self.iter_items(service=service)) as items:
+            for found, first, value in items:
+                password = self._decode_password(found, first, value)
+                return SimpleCredential(first, password)
+        return None
+
+    def get_passwords(self, credentials):
+        """
+        Read the passwords for an iterable of (service, username) pairs,
+        loading the file only once.
+
+        Return a dict mapping each pair to its password, or None if no
+        password is stored for it.
+        """
+        config = self._load_config()
+        values = [
+            (
+                (service, username),
+                _get_value(config, escape_for_ini(service), escape_for_ini(username)),
+            )
+            for service, username in credentials
+        ]
+        return dict(self._decode_passwords(values))
+
+    def _decode_passwords(self, values):
+        """
+        Decode and decrypt values, pairs of (service, username) and the
+        value read from the file. Yield each pair with its password, in
+        any order.
+        """
+        for (service, username), value in values:
+            yield (service, username), self._decode_password(service, username, value)
 
-        # fetch the password
+    def _decode_password(self, service, username, value):
+        """
+        Decode and decrypt a value read from the file.
+        """
+        if value is None:
+            return None
+        assoc = self._generate_assoc(service, username)
+        # decode with base64
+        password_encrypted = decodebytes(value.encode())
+        # decrypt the password with associated data
         try:
-            password_base64 = config.get(service, username).encode()
-            # decode with base64
-            password_encrypted = decodebytes(password_base64)
-            # decrypt the password with associated data
+            password = self.decrypt(password_encrypted, assoc)
+        except ValueError:
+            # decrypt the password without associated data
+            password = self.decrypt(password_encrypted)
+        return password.decode('utf-8')
+
+    def _read_value(self, section, option):
+        """
+        Return the value of option in section, or None if not found.
+
+        The first lookup after the file changes scans the file only as far
+        as needed to find the value. Should the file still be unchanged at
+        the next lookup, it is parsed (and cached) as a whole.
+        """
+        key = file_key, journal_key = self._config_key()
+        cached_key, config = self._config_cache
+        stale = config is None or key != cached_key
+        scan = (
+            stale
+            and self._transaction is None
+            and file_key is not None
+            and journal_key is None
+            and key != self._scanned_key
+        )
+        if scan:
+            self._scanned_key = key
+            with self._locked(), open(self.file_path, encoding='utf-8') as lines:
+                try:
+                    return _scan_value(lines, section, option)
+                except _ScanUnsupported:
+                    pass
+        return self._config_value(section, option)
+
+    def _config_value(self, section, option):
+        """
+        Return the value of option in section from the loaded config, or
+        None if not found.
+        """
+        return _get_value(self._load_config(), section, option)
+
+    def iter_services(self):
+        """
+        Yield the name of each service with passwords stored.
+        """
+        last = None
+        for section, _, _ in self._entries():
+            if section != last and section not in self._hidden_sections:
+                yield unescape(section)
+            last = section
+
+    def iter_credentials(self, service=None):
+        """
+        Yield the service and username of each password stored, or of
+        those for service only, without decrypting anything.
+        """
+        for found, username, _ in self.iter_items(service=service):
+            yield found, username
+
+    def iter_items(self, decrypt=False, service=None):
+        """
+        Yield the service, username and password of each entry, or of
+        those for service only. Unless decrypt, the password is left as
+        stored, encrypted and encoded.
+
+        Entries are read from storage as they are consumed, so memory use
+        doesn't depend on the number of entries where storage allows.
+        """
+        wanted = None if service is None else escape_for_ini(service)
+        for section, option, value in self._entries(wanted):
+            if section in self._hidden_sections:
+                continue
+            found, username = unescape(section), unescape(option)
+            if decrypt:
+                value = self._decode_password(found, username, value)
+            yield found, username, value
+
+    def find(self, service_prefix='', username_glob='*'):
+        """
+        Yield the service and username of each password stored for a
+        service starting with service_prefix and a username matching the
+        shell-style username_glob, case-insensitively. Nothing is
+        decrypted.
+
+        Services are looked up in sorted order, so only those starting
+        with service_prefix are visited.
+        """
+        # escaping encodes each byte on its own and no code is a prefix of
+        # another, so escaped names start with the escaped prefix
+        prefix = escape_for_ini(service_prefix)
+        matches = re.compile(fnmatch.translate(username_glob), re.IGNORECASE).match
+        for section, option, _ in self._prefix_entries(prefix):
+            if section in self._hidden_sections:
+                continue
+            username = unescape(option)
+            if matches(username):
+                yield unescape(section), username
+
+    def _prefix_entries(self, prefix):
+        """
+        Yield the section, option and value of each entry in the sections
+        starting with prefix, seeing the changes pending in a transaction.
+        """
+        if self._transaction is not None:
+            return self._config_prefix_entries(prefix)
+        return self._iter_prefix_entries(prefix)
+
+    def _iter_prefix_entries(self, prefix):
+        """
+        Yield the section, option and value of each entry in storage in
+        the sections starting with prefix. Subclasses storing the sections
+        in sorted order override this.
+        """
+        return self._config_prefix_entries(prefix)
+
+    def _config_prefix_entries(self, prefix):
+        """
+        Yield the section, option and value of each entry in the loaded
+        config in the sections starting with prefix, found in a sorted
+        index of the sections, which is re-built when the config changes.
+        """
+        config = self._load_config()
+        index_key, sections = self._section_index
+        if self._transaction is not None or self._config_cache[1] is not config:
+            sections = sorted(config.sections())
+        elif index_key is not self._config_cache:
+            sections = sorted(config.sections())
+            self._section_index = self._config_cache, sections
+        for section in sections[bisect.bisect_left(sections, prefix) :]:
+            if not section.startswith(prefix):
+                break
+            for option in config.options(section):
+                yield section, option, config.get(section, option)
+
+    def _entries(self, section=None):
+        """
+        Yield the section, option and value of each entry, or of those in
+        section only, seeing the changes pending in a transaction.
+        """
+        if self._transaction is not None:
+            return self._config_entries(section)
+        return self._iter_entries(section)
+
+    def _iter_entries(self, section):
+        """
+        Yield the section, option and value of each entry in storage, or
+        of those in section only.
+
+        An unchanged file is iterated from the cache; otherwise the file
+        is scanned, holding on to one entry at a time. Subclasses storing
+        passwords other than in an INI file override this.
+        """
+        key = file_key, journal_key = self._config_key()
+        cached_key, config = self._config_cache
+        if (config is not None and key == cached_key) or journal_key is not None:
+            yield from self._config_entries(section)
+            return
+        if file_key is None:
+            return
+        # the file is replaced atomically, so no lock is needed to read a
+        # consistent version of it
+        scanned = 0
+        with open(self.file_path, encoding='utf-8') as lines:
             try:
-                password = self.decrypt(password_encrypted, assoc).decode('utf-8')
-            except ValueError:
-                # decrypt the password without associated data
-                password = self.decrypt(password_encrypted).decode('utf-8')
-        except (configparser.NoOptionError, configparser.NoSectionError):
-            password = None
-        return password
+                for entry in _scan_items(lines):
+                    if section is None or entry[0] == section:
+                        scanned += 1
+                        yield entry
+                return
+            except _ScanUnsupported:
+                pass
+        # the parsed file holds the entries in the same order
+        yield from itertools.islice(self._config_entries(section), scanned, None)
+
+    def _config_entries(self, section=None):
+        """
+        Yield the section, option and value of each entry in the loaded
+        config, or of those in section only.
+        """
+        config = self._load_config()
+        if section is None:
+            sections = config.sections()
+        else:
+            sections = [section] if config.has_section(section) else []
+        for name in sections:
+            for option in config.options(name):
+                yield name, option, config.get(name, option)
 
     def set_password(self, service, username, password):
         """Write the password in the file."""
+        password_base64 = self._encode_password(service, username, password)
+        self._write_config_value(service, username, password_base64)
+
+    def set_passwords(self, passwords):
+        """
+        Write the passwords in a mapping of (service, username) pairs to
+        passwords, rewriting the file only once.
+        """
+        changes = [
+            (escape_for_ini(service), escape_for_ini(username), value)
+            for (service, username), value in self._encode_passwords(passwords.items())
+        ]
+        self._update(changes)
+
+    def _encode_passwords(self, passwords):
+        """
+        Encrypt and encode passwords, pairs of (service, username) and
+        password. Yield each pair with its value for the file, in any
+        order.
+        """
+        for (service, username), password in passwords:
+            yield (
+                (service, username),
+                self._encode_password(service, username, password),
+            )
+
+    def _check_password(self, username, password):
+        """
+        Raise an error if username and password can't be stored.
+        """
         if not username:
             # https://github.com/jaraco/keyrings.alt/issues/21
             raise ValueError("Username cannot be blank.")
         if not isinstance(password, str):
             raise TypeError("Password should be a unicode string, not bytes.")
+
+    def _encode_password(self, service, username, password):
+        """
+        Encrypt the password and encode it for the file.
+        """
+        self._check_password(username, password)
         assoc = self._generate_assoc(service, username)
         # encrypt the password
         password_encrypted = self.encrypt(password.encode('utf-8'), assoc)
         # encode with base64 and add line break to untangle config file
-        password_base64 = '\n' + encodebytes(password_encrypted).decode()
-
-        self._write_config_value(service, username, password_base64)
+        return '\n' + encodebytes(password_encrypted).decode()
 
     def _generate_assoc(self, service, username):
         """Generate tamper resistant bytestring of associated data"""
         return (escape_for_ini(service) + r'\0' + escape_for_ini(username)).encode()
 
     def _write_config_value(self, service, key, value):
+        self._update([(escape_for_ini(service), escape_for_ini(key), value)])
+
+    def _update(self, changes):
+        """
+        Apply changes to the file.
+
+        changes is a sequence of (section, option, value) with names already
+        escaped; a value of None removes the option.
+        """
+        if not changes:
+            return
+
+        if self._transaction is not None:
+            config, pending = self._transaction
+            _apply_changes(config, changes)
+            pending.extend(changes)
+            return
+
+        self._write_changes(changes)
+
+    def _write_changes(self, changes):
+        """
+        Write changes to storage. Subclasses storing passwords other than
+        in an INI file override this and `_read_config`.
+        """
         # ensure the file exists
         self._ensure_file_path()
 
-        # load the keyring from the disk
+        with self._locked(exclusive=True):
+            if _flag(self.journal):
+                self._append_journal(changes)
+                return
+
+            self._rewrite(lambda config: changes)
+
+    def _rewrite(self, transform):
+        """
+        Apply the changes transform returns for the current config, and
+        write storage as a whole, so an interruption leaves either all of
+        the changes or none, even in journal mode. Other writers wait for
+        the rewrite to complete.
+
+        Subclasses storing passwords other than in an INI file override
+        this.
+        """
+        self._ensure_file_path()
+        with self._locked(exclusive=True):
+            if os.path.exists(self.journal_path):
+                # fold the journal in first, so a crash can't replay it over
+                # these changes
+                self.compact()
+            config = self._read_config()
+            _apply_changes(config, transform(config))
+            self._save_config(config)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Collect the changes made in the block and write them to the file
+        at once when it exits, or discard them if it raises.
+
+        Reads in the block see the pending changes. A nested transaction
+        joins the outer one.
+        """
+        if self._transaction is not None:
+            yield
+            return
         config = configparser.RawConfigParser()
-        config.read(self.file_path, encoding='utf-8')
+        config.read_dict(self._load_config())
+        pending = []
+        self._transaction = config, pending
+        try:
+            yield
+        finally:
+            del self._transaction
+        self._update(pending)
+
+    def _stat_key(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return path, stat.st_ino, stat.st_size, stat.st_mtime_ns
 
-        service = escape_for_ini(service)
-        key = escape_for_ini(key)
+    def _config_key(self):
+        """
+        Return a key identifying the current state of the file and its
+        journal.
+        """
+        return self._stat_key(self.file_path), self._stat_key(self.journal_path)
+
+    def _load_config(self):
+        """
+        Load the passwords from storage, as a RawConfigParser or an object
+        supporting its read operations.
 
-        # update the keyring with the password
-        if not config.has_section(service):
-            config.add_section(service)
-        config.set(service, key, value)
+        Inside a transaction, return the transaction's working config.
+        """
+        if self._transaction is not None:
+            return self._transaction[0]
+        return self._read_config()
+
+    def _read_config(self):
+        """
+        Load the passwords from the file, with the journal (if any)
+        replayed over it.
+
+        The parsed config is cached and only re-read when the file has
+        changed on disk. Callers that modify the config must persist it
+        with `_save_config`.
+        """
+        key = self._config_key()
+        cached_key, config = self._config_cache
+        if config is not None and key == cached_key:
+            return config
+        config = configparser.RawConfigParser()
+        if key == (None, None):
+            self._config_cache = key, config
+            return config
+        with self._locked():
+            key = file_key, journal_key = self._config_key()
+            if file_key is not None:
+                config.read(self.file_path, encoding='utf-8')
+            if journal_key is not None:
+                _apply_changes(config, self._read_journal())
+        self._config_cache = key, config
+        return config
 
-        # save the keyring back to the file
-        with open(self.file_path, 'w', encoding='utf-8') as config_file:
+    def _save_config(self, config):
+        """
+        Write the config to the file, discarding the journal it supersedes,
+        and cache it as the file's content.
+        """
+        # forget the cache first, so a failed write can't leave it stale
+        self._config_cache = None, None
+        with self._replace_file(self.file_path) as config_file:
             config.write(config_file)
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        else:
+            self._sync_dir(self.journal_path)
+        self._config_cache = self._config_key(), config
 
     def _ensure_file_path(self):
         """
@@ -160,24 +656,283 @@ class Keyring(FileBacked, KeyringBackend):
         if needs_storage_root:  # pragma: no cover
             os.makedirs(storage_root)
         if not os.path.isfile(self.file_path):
-            # create the file without group/world permissions
-            with open(self.file_path, 'w', encoding='utf-8'):
+            # create the file without group/world permissions; append mode,
+            # so a file created concurrently by another process isn't
+            # truncated
+            with open(self.file_path, 'a', encoding='utf-8'):
                 pass
             user_read_write = 0o600
             os.chmod(self.file_path, user_read_write)
 
     def delete_password(self, service, username):
         """Delete the password for the username of the service."""
-        service = escape_for_ini(service)
-        username = escape_for_ini(username)
+        self.delete_passwords([(service, username)])
+
+    def delete_passwords(self, credentials):
+        """
+        Delete the passwords for an iterable of (service, username) pairs,
+        rewriting the file only once.
+
+        Raise PasswordDeleteError, without deleting anything, if any of the
+        passwords is not found.
+        """
+        config = self._load_config()
+        changes = [
+            (escape_for_ini(service), escape_for_ini(username), None)
+            for service, username in credentials
+        ]
+        for service, username, _ in changes:
+            if not config.has_option(service, username):
+                raise PasswordDeleteError("Password not found")
+        self._update(changes)
+
+    def import_file(self, path):
+        """
+        Copy the passwords from the INI keyring file at path, such as
+        ``keyring_pass.cfg`` or ``crypted_pass.cfg``, into this keyring.
+
+        Entries are copied as stored, so the source must use the same
+        encryption (and, for encrypted keyrings, the same password).
+        Entries already in this keyring are replaced.
+        """
         config = configparser.RawConfigParser()
-        if os.path.exists(self.file_path):
-            config.read(self.file_path, encoding='utf-8')
+        with open(path, encoding='utf-8') as config_file:
+            config.read_file(config_file)
+        self._update([
+            (section, option, value)
+            for section in config.sections()
+            for option, value in config.items(section)
+        ])
+
+    @properties.NonDataProperty
+    def lock_path(self):
+        """
+        The path to the file locked to serialize access to the keyring.
+        """
+        return self.file_path + '.lock'
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive=False):
+        """
+        Hold a shared (or exclusive) lock on the keyring for the block.
+
+        A lock already held by this keyring in the current thread is
+        re-used.
+        """
+        state = self._lock_state
+        if fcntl is None or getattr(state, 'held', False):
+            yield
+            return
         try:
-            if not config.remove_option(service, username):
-                raise PasswordDeleteError("Password not found")
-        except configparser.NoSectionError:
-            raise PasswordDeleteError("Password not found")
-        # update the file
-        with open(self.file_path, 'w', encoding='utf-8') as config_file:
-            config.write(config_file)
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as exc:
+            if exclusive or exc.errno not in _READ_ONLY_ERRORS:
+                raise
+            # the file is replaced atomically, so a keyring this user can't
+            # write next to is still read consistently without the lock
+            yield
+            return
+        try:
+            start = time.perf_counter()
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self.lock_wait += time.perf_counter() - start
+            state.held = True
+            try:
+                yield
+            finally:
+                state.held = False
+        finally:
+            # closing the descriptor releases the lock
+            os.close(fd)
+
+    @properties.NonDataProperty
+    def _lock_state(self):
+        self._lock_state = threading.local()
+        return self._lock_state
+
+    @properties.NonDataProperty
+    def journal_path(self):
+        """
+        The path to the journal of changes not yet folded into the file.
+        """
+        return self.file_path + '.journal'
+
+    def _read_journal(self):
+        """
+        Yield the changes recorded in the journal.
+
+        A record left incomplete by an interrupted write is ignored.
+        """
+        with open(self.journal_path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    yield tuple(json.loads(line))
+                except ValueError:
+                    continue
+
+    def _append_journal(self, changes):
+        config = self._read_config()
+        records = ''.join(json.dumps(change) + '\n' for change in changes)
+        created = not os.path.exists(self.journal_path)
+        flags = os.O_RDWR | os.O_APPEND | os.O_CREAT
+        fd = os.open(self.journal_path, flags, 0o600)
+        if os.fstat(fd).st_size:
+            os.lseek(fd, -1, os.SEEK_END)
+            if os.read(fd, 1) != b'\n':
+                # end the record left incomplete by an interrupted write, so
+                # it doesn't swallow the first of these
+                records = '\n' + records
+        with open(fd, 'w', encoding='utf-8') as journal:
+            journal.write(records)
+            journal.flush()
+            self._sync_file(fd)
+        if created:
+            self._sync_dir(self.journal_path)
+        _apply_changes(config, changes)
+        key = self._config_key()
+        self._config_cache = key, config
+        if self._journal_exceeded(*key):
+            self.compact()
+
+    def _journal_exceeded(self, file_key, journal_key):
+        """
+        Is the journal large enough, absolutely and relative to the file,
+        to be worth compacting?
+        """
+        file_size = file_key[2] if file_key else 0
+        journal_size = journal_key[2] if journal_key else 0
+        limit = max(
+            int(self.journal_min_size), file_size * float(self.journal_max_ratio)
+        )
+        return journal_size > limit
+
+    def compact(self):
+        """
+        Fold the journal into the file.
+
+        Replaying the journal is idempotent, so an interrupted compaction
+        leaves the keyring intact.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        with self._locked(exclusive=True):
+            if os.path.exists(self.journal_path):
+                self._save_config(self._read_config())
+
+
+def _encode(data):
+    """
+    Return data base64-encoded, as text on a single line.
+    """
+    return b64encode(data).decode()
+
+
+def _flag(value):
+    """
+    Interpret a boolean setting, which is a string when set through a
+    KEYRING_PROPERTY_* environment variable.
+
+    >>> [_flag(value) for value in (True, 0, '1', 'yes', '0', 'false', '')]
+    [True, False, True, True, False, False, False]
+    """
+    if isinstance(value, str):
+        return value.strip().lower() not in ('', '0', 'false', 'no', 'off')
+    return bool(value)
+
+
+def _get_value(config, section, option):
+    try:
+        return config.get(section, option)
+    except (configparser.NoOptionError, configparser.NoSectionError):
+        return None
+
+
+class _ScanUnsupported(Exception):
+    """
+    The file uses features of the INI format that require a full parse.
+    """
+
+
+_SECTION = re.compile(r'\[(?P<header>.+)\]')
+_OPTION = re.compile(r'(?P<option>.*?)\s*(?P<vi>[=:])\s*(?P<value>.*)$')
+
+
+def _scan_value(lines, section, option):
+    """
+    Find the value of option in section among lines of an INI file,
+    stopping as soon as the value is complete.
+
+    Return None if the value isn't found. Raise _ScanUnsupported as
+    `_scan_items` does.
+    """
+    option = option.lower()
+    for entry in _scan_items(lines):
+        if entry[:2] == (section, option):
+            return entry[2]
+    return None
+
+
+def _scan_items(lines):
+    """
+    Yield the section, option and value of each entry among lines of an
+    INI file, reading them as RawConfigParser does, but holding on to no
+    other content.
+
+    Raise _ScanUnsupported for a DEFAULT section or content
+    RawConfigParser rejects.
+    """
+    section = option = value = None
+    indent_level = 0
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith(('#', ';')):
+            # neither ends a value; an empty line may be part of one
+            if value is not None and not stripped:
+                value.append('')
+            continue
+        cur_indent_level = len(line) - len(line.lstrip())
+        if value is not None and cur_indent_level > indent_level:
+            # continuation of the current value
+            value.append(stripped)
+            continue
+        if value is not None:
+            yield section, option, '\n'.join(value).rstrip()
+            value = None
+        indent_level = cur_indent_level
+        header, name, option_value = _parse_line(stripped, section)
+        if header:
+            section = name
+            continue
+        option, value = name, [option_value]
+    if value is not None:
+        yield section, option, '\n'.join(value).rstrip()
+
+
+def _parse_line(stripped, section):
+    """
+    Parse a section header or the first line of an option.
+
+    Return (True, section, None) or (False, option, value).
+    """
+    header = _SECTION.match(stripped)
+    if header:
+        name = header.group('header')
+        if name == configparser.DEFAULTSECT:
+            raise _ScanUnsupported()
+        return True, name, None
+    match = _OPTION.match(stripped)
+    name = match and match.group('option').rstrip().lower()
+    if section is None or not name:
+        raise _ScanUnsupported()
+    return False, name, match.group('value').strip()
+
+
+def _apply_changes(config, changes):
+    for section, option, value in changes:
+        if value is None:
+            if config.has_section(section):
+                config.remove_option(section, option)
+            continue
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, option, value)
@@ -0,0 +1,258 @@
+"""
+Keyrings storing passwords in a compact, indexed binary file.
+
+The file starts with a sorted index of the escaped (service, username)
+keys, followed by the keys and the encoded passwords themselves::
+
+    header: magic | format version | entry count
+    index:  (key offset, key length, value offset, value length) * count
+    data:   keys and values
+
+Lookups memory-map the file and binary-search the index, so reading a
+password doesn't parse the file and takes time logarithmic in the number
+of passwords stored. On Windows, where a mapped file can't be replaced,
+the file is read into memory instead. Every change rewrites the whole
+file, which suits keyrings that are read much more often than they are
+written.
+
+The values in the data section are the passwords as an INI keyring file
+holds them, encrypted and base64-encoded alike, which lets `import_file`
+convert an existing file.
+
+The keyrings here become known to keyring once this module is imported.
+Since they rank below the INI keyrings, keyring only uses one when
+configured to, for example with
+``default-keyring=keyrings.alt.indexed.EncryptedKeyring``.
+"""
+
+import bisect
+import configparser
+import mmap
+import struct
+import sys
+
+from . import file, file_base
+
+MAGIC = b'KRIX'
+FORMAT = 1
+HEADER = struct.Struct('<4sIQ')
+ENTRY = struct.Struct('<QIQI')
+
+
+def _make_key(section, option):
+    # escaped names are alphanumeric, so the NUL separator sorts the keys
+    # by section, then by (case-insensitive, as in RawConfigParser) option
+    return f'{section}\0{option.lower()}'.encode('ascii')
+
+
+def _dump(entries, out):
+    """
+    Write entries, a dict of (section, option) to value, to out.
+    """
+    items = sorted(
+        (_make_key(section, option), value.encode('utf-8'))
+        for (section, option), value in entries.items()
+    )
+    offset = HEADER.size + ENTRY.size * len(items)
+    index = []
+    for key, value in items:
+        index.append(ENTRY.pack(offset, len(key), offset + len(key), len(value)))
+        offset += len(key) + len(value)
+    out.write(HEADER.pack(MAGIC, FORMAT, len(items)))
+    out.writelines(index)
+    for key, value in items:
+        out.write(key)
+        out.write(value)
+
+
+class Index:
+    """
+    A read-only view of an indexed keyring file, supporting the read
+    operations of RawConfigParser used by the keyring.
+    """
+
+    def __init__(self, data=b''):
+        self._data = data
+        self._count = 0
+        if not data:
+            return
+        magic, version, self._count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT:
+            raise ValueError("Not an indexed keyring file")
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as index_file:
+            if sys.platform == 'win32':
+                # a mapping would keep other keyrings from replacing the file
+                return cls(index_file.read())
+            try:
+                data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # an empty file can't be mapped
+                data = b''
+        return cls(data)
+
+    def _entry(self, n):
+        return ENTRY.unpack_from(self._data, HEADER.size + ENTRY.size * n)
+
+    def _key(self, n):
+        key_offset, key_length, _, _ = self._entry(n)
+        return bytes(self._data[key_offset : key_offset + key_length])
+
+    def _value(self, n):
+        _, _, value_offset, value_length = self._entry(n)
+        return self._data[value_offset : value_offset + value_length].decode('utf-8')
+
+    def _find(self, key):
+        """
+        Return the position of the first key not less than key.
+        """
+        return bisect.bisect_left(range(self._count), key, key=self._key)
+
+    def _keys(self):
+        for n in range(self._count):
+            section, _, option = self._key(n).decode('ascii').partition('\0')
+            yield n, section, option
+
+    def sections(self):
+        return list(dict.fromkeys(section for _, section, _ in self._keys()))
+
+    def has_section(self, section):
+        prefix = _make_key(section, '')
+        n = self._find(prefix)
+        return n < self._count and self._key(n).startswith(prefix)
+
+    def options(self, section):
+        prefix = _make_key(section, '')
+        options = []
+        for n in range(self._find(prefix), self._count):
+            key = self._key(n)
+            if not key.startswith(prefix):
+                break
+            options.append(key[len(prefix) :].decode('ascii'))
+        if not options:
+            raise configparser.NoSectionError(section)
+        return options
+
+    def has_option(self, section, option):
+        return self._lookup(section, option) is not None
+
+    def get(self, section, option):
+        n = self._lookup(section, option)
+        if n is None:
+            if not self.has_section(section):
+                raise configparser.NoSectionError(section)
+            raise configparser.NoOptionError(option, section)
+        return self._value(n)
+
+    def _lookup(self, section, option):
+        key = _make_key(section, option)
+        n = self._find(key)
+        if n < self._count and self._key(n) == key:
+            return n
+        return None
+
+    def iter_entries(self, section=None):
+        """
+        Yield the section, option and value of each entry, or of those in
+        section only, in the order of the index.
+        """
+        return self._iter_keys(b'' if section is None else _make_key(section, ''))
+
+    def iter_prefix(self, prefix):
+        """
+        Yield the section, option and value of each entry in the sections
+        starting with prefix, in the order of the index.
+        """
+        return self._iter_keys(prefix.encode('ascii'))
+
+    def _iter_keys(self, prefix):
+        for n in range(self._find(prefix), self._count):
+            key = self._key(n)
+            if not key.startswith(prefix):
+                break
+            section, _, option = key.decode('ascii').partition('\0')
+            yield section, option, self._value(n)
+
+    def entries(self):
+        """
+        Return a dict of (section, option) to value for all entries.
+        """
+        return {
+            (section, option): self._value(n) for n, section, option in self._keys()
+        }
+
+    def items(self):
+        """
+        Yield each section with a dict of its options, as used by
+        RawConfigParser.read_dict.
+        """
+        sections = {}
+        for (section, option), value in self.entries().items():
+            sections.setdefault(section, {})[option] = value
+        return sections.items()
+
+
+class Keyring(file_base.AlternativeStorage, file_base.Keyring):
+    """
+    Base for keyrings storing passwords in an indexed binary file at
+    `file_path`.
+
+    The memory-mapped index is re-used for as long as the file is
+    unchanged on disk.
+    """
+
+    def _read_config(self):
+        key = self._config_key()
+        cached_key, index = self._config_cache
+        if index is not None and key == cached_key:
+            return index
+        file_key, _ = key
+        index = Index()
+        if file_key is not None:
+            with self._locked():
+                key = self._config_key()
+                index = Index.open(self.file_path)
+        self._config_cache = key, index
+        return index
+
+    _read_value = file_base.Keyring._config_value
+
+    def _iter_entries(self, section):
+        return self._read_config().iter_entries(section)
+
+    def _iter_prefix_entries(self, prefix):
+        return self._read_config().iter_prefix(prefix)
+
+    def _write_changes(self, changes):
+        self._ensure_file_path()
+        with self._locked(exclusive=True):
+            entries = self._read_config().entries()
+            for section, option, value in changes:
+                key = section, option.lower()
+                if value is None:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = value
+            self._config_cache = None, None
+            with self._replace_file(self.file_path, binary=True) as out:
+                _dump(entries, out)
+
+    def _rewrite(self, transform):
+        # the file is rewritten as a whole anyway
+        self._ensure_file_path()
+        with self._locked(exclusive=True):
+            self._write_changes(transform(self._read_config()))
+
+
+class PlaintextKeyring(Keyring, file.PlaintextKeyring):
+    """Indexed File Keyring with no encryption"""
+
+    filename = 'keyring_pass.idx'
+
+
+class EncryptedKeyring(Keyring, file.EncryptedKeyring):
+    """PyCryptodome Indexed File Keyring"""
+
+    filename = 'crypted_pass.idx'
@@ -1,9 +1,25 @@
 import itertools
+import re
+import zlib
 
 from jaraco.classes import properties
 from keyring import errors
 from keyring.backend import KeyringBackend
 
+_PART = re.compile(r'\{\{part_\d+\}\}$')
+"Suffix of the usernames holding further parts of a password."
+
+MANIFEST_FMT = '{{parts=%d crc32=%s}}'
+"""
+Prefix of the first part of a password stored in several parts, giving
+the number of parts and the CRC-32 of the password. A password in one
+part only has one if it would otherwise be taken for a manifest.
+"""
+
+_MANIFEST = re.compile(
+    r'\{\{parts=(?P<count>[1-9]\d*) crc32=(?P<checksum>[0-9a-f]{8})\}\}'
+)
+
 
 class MultipartKeyringWrapper(KeyringBackend):
     """A wrapper around an existing keyring that breaks the password into
@@ -22,39 +38,117 @@ class MultipartKeyringWrapper(KeyringBackend):
     def get_password(self, service, username):
         """Get password of the username for the service"""
         init_part = self._keyring.get_password(service, username)
-        if init_part:
-            parts = [init_part]
-            i = 1
-            while True:
-                next_part = self._keyring.get_password(
-                    service, '%s{{part_%d}}' % (username, i)
-                )
-                if next_part:
-                    parts.append(next_part)
-                    i += 1
-                else:
-                    break
-            return ''.join(parts)
-        return None
+        if not init_part:
+            return None
+        manifest = _MANIFEST.match(init_part)
+        if not manifest:
+            # without a manifest, parts follow until one is missing
+            return ''.join([init_part, *self._probe(service, username)])
+        parts = [init_part[manifest.end() :]] + [
+            self._keyring.get_password(service, _part_name(username, i))
+            for i in range(1, int(manifest['count']))
+        ]
+        if None in parts:
+            # some part was deleted
+            return None
+        password = ''.join(parts)
+        if _checksum(password) != manifest['checksum']:
+            # some part was replaced, perhaps by a write in progress
+            return None
+        return password
+
+    def _probe(self, service, username):
+        """
+        Yield the parts after the first of a password stored without a
+        manifest, up to the first one missing.
+        """
+        for i in itertools.count(1):
+            part = self._keyring.get_password(service, _part_name(username, i))
+            if not part:
+                return
+            yield part
+
+    def _part_count(self, service, username):
+        """
+        Return the number of parts of the password stored for the
+        username of the service.
+        """
+        init_part = self._keyring.get_password(service, username)
+        if init_part is None:
+            return 0
+        manifest = _MANIFEST.match(init_part)
+        if manifest:
+            return int(manifest['count'])
+        return 1 + sum(1 for _ in self._probe(service, username))
+
+    def _split(self, password):
+        """
+        Split password into parts. Passwords needing several parts start
+        with a manifest of the number of parts and a checksum of the
+        password, if it fits, as do passwords starting like one.
+        """
+        size = self._max_password_size
+        if len(password) <= size and not _MANIFEST.match(password):
+            # stored as is, for other readers of the wrapped keyring
+            return [password]
+        count = 1
+        while True:
+            manifest = MANIFEST_FMT % (count, _checksum(password))
+            first = size - len(manifest)
+            if first < 1:
+                # no room for a manifest, so store the parts alone
+                segments = range(0, len(password), size)
+                return [password[i : i + size] for i in segments]
+            segments = range(first, len(password), size)
+            parts = [manifest + password[:first]]
+            parts += [password[i : i + size] for i in segments]
+            if len(parts) == count:
+                return parts
+            # a longer count makes for a longer manifest
+            count = len(parts)
 
     def set_password(self, service, username, password):
         """Set password for the username of the service"""
-        segments = range(0, len(password), self._max_password_size)
-        password_parts = [password[i : i + self._max_password_size] for i in segments]
-        for i, password_part in enumerate(password_parts):
-            curr_username = username
-            if i > 0:
-                curr_username += '{{part_%d}}' % i
-            self._keyring.set_password(service, curr_username, password_part)
+        stored = self._part_count(service, username)
+        password_parts = self._split(password)
+        # write the first part, holding the manifest, last
+        for i, password_part in reversed(list(enumerate(password_parts))):
+            self._keyring.set_password(service, _part_name(username, i), password_part)
+        self._delete_parts(service, username, range(len(password_parts), stored))
 
     def delete_password(self, service, username):
+        stored = self._part_count(service, username)
         self._keyring.delete_password(service, username)
-        count = itertools.count(1)
-        while True:
-            part_name = '%(username)s{{part_%(index)d}}' % dict(
-                index=next(count), **vars()
-            )
+        self._delete_parts(service, username, range(1, stored))
+
+    def _delete_parts(self, service, username, indexes):
+        for i in indexes:
             try:
-                self._keyring.delete_password(service, part_name)
+                self._keyring.delete_password(service, _part_name(username, i))
             except errors.PasswordDeleteError:
-                break
+                pass
+
+    def find(self, service_prefix='', username_glob='*'):
+        """
+        Yield the service and username of each password stored for a
+        service starting with service_prefix and a username matching
+        username_glob, as found by the wrapped keyring, which must
+        support `find` like the file keyrings. Entries holding further
+        parts of passwords are left out.
+        """
+        for service, username in self._keyring.find(service_prefix, username_glob):
+            if not _PART.search(username):
+                yield service, username
+
+
+def _part_name(username, index):
+    """
+    Return the username under which part index of a password is stored.
+    """
+    if not index:
+        return username
+    return '%s{{part_%d}}' % (username, index)
+
+
+def _checksum(password):
+    return '%08x' % zlib.crc32(password.encode('utf-8'))
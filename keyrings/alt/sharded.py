@@ -0,0 +1,278 @@
+"""
+Keyrings spreading passwords over a directory of shard files.
+
+`file_path` names a directory holding a manifest and a number of shard
+files, each stored like the INI keyring files of `keyrings.alt.file`.
+Passwords are assigned to a shard by a hash of the escaped service name,
+so a change only rewrites one small shard, and writers to different
+shards don't wait for each other. The number of shards is recorded in
+the manifest and may be changed with `reshard`.
+
+A shard is an ordinary INI keyring file holding the sections that hash
+to it, so `import_file` can spread the entries of an existing keyring
+file over the shards.
+
+Like the other storage modules, this one makes its keyrings known to
+keyring on import, ranked below the INI keyrings so they are never
+chosen by default. Configure one explicitly, for example with
+``default-keyring=keyrings.alt.sharded.EncryptedKeyring``.
+"""
+
+import configparser
+import itertools
+import os
+import zlib
+
+from jaraco.classes import properties
+
+from . import file, file_base
+
+
+def _bucket(section, count):
+    """
+    Return the number of the shard holding section.
+    """
+    return zlib.crc32(section.encode('ascii')) % count
+
+
+class Shard(file_base.Keyring):
+    """
+    A single file of a sharded keyring. It stores the values given to it
+    as they are; it is not a keyring backend of its own.
+    """
+
+    filename = None
+    scheme = None
+    version = None
+
+    @properties.classproperty
+    def priority(cls):
+        raise RuntimeError("Not a keyring backend")
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def encrypt(self, password, assoc=None):
+        return password
+
+    def decrypt(self, password_encrypted, assoc=None):
+        return password_encrypted
+
+
+class Shards:
+    """
+    A read-only view of the passwords in all shards, supporting the read
+    operations of RawConfigParser used by the keyring.
+    """
+
+    def __init__(self, keyring):
+        self._keyring = keyring
+
+    def _config(self, section):
+        # hold the manifest lock so a reshard can't remove the shard
+        # before it's read
+        with self._keyring._manifest._locked():
+            shards = self._keyring._layout()
+            return shards[_bucket(section, len(shards))]._read_config()
+
+    def _configs(self):
+        with self._keyring._manifest._locked():
+            return [shard._read_config() for shard in self._keyring._layout()]
+
+    def sections(self):
+        return sorted(
+            itertools.chain.from_iterable(
+                config.sections() for config in self._configs()
+            )
+        )
+
+    def has_section(self, section):
+        return self._config(section).has_section(section)
+
+    def options(self, section):
+        return self._config(section).options(section)
+
+    def has_option(self, section, option):
+        return self._config(section).has_option(section, option)
+
+    def get(self, section, option):
+        return self._config(section).get(section, option)
+
+    def items(self):
+        """
+        Yield each section with a dict of its options, as used by
+        RawConfigParser.read_dict.
+        """
+        for config in self._configs():
+            for section in config.sections():
+                yield section, dict(config.items(section))
+
+
+class Keyring(file_base.AlternativeStorage, file_base.Keyring):
+    """
+    Base for keyrings storing passwords in a directory of shard files at
+    `file_path`.
+
+    Changes touching several shards are written shard by shard, so only
+    the changes to each shard are atomic.
+    """
+
+    shard_count = 16
+    "Number of shards used for a new keyring."
+
+    @properties.NonDataProperty
+    def _shards(self):
+        self._shards = {}
+        return self._shards
+
+    def _shard(self, name):
+        path = os.path.join(self.file_path, name)
+        shard = self._shards.get(path)
+        if shard is None:
+            shard = self._shards[path] = Shard(path)
+        shard.durability = self.durability
+        shard.journal = self.journal
+        return shard
+
+    @property
+    def _manifest(self):
+        return self._shard('manifest.cfg')
+
+    def _layout(self):
+        """
+        Return the shards in the current layout.
+        """
+        manifest = self._manifest._read_config()
+        generation = manifest.get('shards', 'generation')
+        count = manifest.getint('shards', 'count')
+        return [self._shard(f'{generation}.{n}.cfg') for n in range(count)]
+
+    def _read_config(self):
+        if not os.path.exists(self._manifest.file_path):
+            return configparser.RawConfigParser()
+        return Shards(self)
+
+    def _read_value(self, section, option):
+        if self._transaction is not None:
+            return self._config_value(section, option)
+        if not os.path.exists(self._manifest.file_path):
+            return None
+        with self._manifest._locked():
+            shards = self._layout()
+            return shards[_bucket(section, len(shards))]._read_value(section, option)
+
+    def _iter_entries(self, section):
+        if not os.path.exists(self._manifest.file_path):
+            return
+        # a reshard waits for the iteration to complete
+        with self._manifest._locked():
+            shards = self._layout()
+            if section is not None:
+                shards = [shards[_bucket(section, len(shards))]]
+            for shard in shards:
+                yield from shard._iter_entries(section)
+
+    def _write_changes(self, changes):
+        self._ensure_file_path()
+        # a shared lock on the manifest keeps the layout stable while
+        # the shards are written
+        with self._manifest._locked():
+            shards = self._layout()
+            by_shard = {}
+            for change in changes:
+                n = _bucket(change[0], len(shards))
+                by_shard.setdefault(n, []).append(change)
+            for n, shard_changes in by_shard.items():
+                shards[n]._update(shard_changes)
+
+    def _ensure_file_path(self):
+        """
+        Ensure the directory and its manifest exist.
+        """
+        manifest = self._manifest
+        if os.path.exists(manifest.file_path):
+            if manifest._read_config().has_section('shards'):
+                return
+        os.makedirs(self.file_path, mode=0o700, exist_ok=True)
+        manifest._ensure_file_path()
+        with manifest._locked(exclusive=True):
+            if not manifest._read_config().has_section('shards'):
+                self._write_manifest(0, self.shard_count)
+
+    def _write_manifest(self, generation, count):
+        self._manifest._update([
+            ('shards', 'generation', str(generation)),
+            ('shards', 'count', str(count)),
+        ])
+
+    def reshard(self, count):
+        """
+        Redistribute the passwords over count shards.
+
+        The new shards are written before the manifest switches to them,
+        so readers and an interrupted reshard only ever see a complete
+        layout. Writers wait for the reshard to complete.
+        """
+        self._regenerate(lambda config: [], count)
+
+    def _rewrite(self, transform):
+        # changes to several shards are only atomic as a new generation
+        self._regenerate(transform)
+
+    def _regenerate(self, transform, count=None):
+        """
+        Write the passwords, with the changes transform returns applied,
+        to a new generation of count shards (as many as now by default),
+        then switch the manifest to it.
+        """
+        self._ensure_file_path()
+        manifest = self._manifest
+        with manifest._locked(exclusive=True):
+            old = self._layout()
+            count = count or len(old)
+            config = manifest._read_config()
+            generation = config.getint('shards', 'generation') + 1
+            new = [self._shard(f'{generation}.{n}.cfg') for n in range(count)]
+            # discard anything left by an interrupted regeneration
+            self._remove(new)
+            passwords = configparser.RawConfigParser()
+            passwords.read_dict(Shards(self))
+            file_base._apply_changes(passwords, transform(passwords))
+            by_shard = {}
+            for section in passwords.sections():
+                by_shard.setdefault(_bucket(section, count), []).extend(
+                    (section, option, value)
+                    for option, value in passwords.items(section)
+                )
+            for n, changes in by_shard.items():
+                new[n]._update(changes)
+            self._write_manifest(generation, count)
+            self._remove(old)
+
+    def _remove(self, shards):
+        for shard in shards:
+            for path in shard.file_path, shard.lock_path, shard.journal_path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            shard._config_cache = None, None
+
+
+class PlaintextKeyring(Keyring, file.PlaintextKeyring):
+    """Sharded File Keyring with no encryption"""
+
+    filename = 'keyring_pass.d'
+
+
+class EncryptedKeyring(Keyring, file.EncryptedKeyring):
+    """PyCryptodome Sharded File Keyring"""
+
+    filename = 'crypted_pass.d'
+
+    def __getstate__(self):
+        # the shards hold the state of their files, which worker processes
+        # leave behind like that of the file
+        state = super().__getstate__()
+        state.pop('_shards', None)
+        return state
@@ -0,0 +1,204 @@
+"""
+Keyrings storing passwords in an SQLite database.
+
+The database holds one row per password, indexed by the escaped service
+and username, so lookups and updates don't depend on the number of
+passwords stored. Each row holds the password as the INI keyring of the
+same encryption would store it, which is how `import_file` copies
+existing keyring files into the database.
+
+Importing this module makes these keyrings known to keyring, but they
+rank below the INI keyrings, so keyring won't pick one by itself.
+Configure one instead, for example with
+``default-keyring=keyrings.alt.sqlite.EncryptedKeyring``.
+"""
+
+import configparser
+import contextlib
+import os
+import sqlite3
+
+from . import file, file_base
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    service TEXT NOT NULL,
+    username TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (service, username)
+) WITHOUT ROWID
+"""
+
+SYNCHRONOUS = {'none': 'OFF', 'file': 'NORMAL', 'file+dir': 'FULL'}
+"SQLite synchronous setting for each durability policy."
+
+
+def _optionxform(option):
+    # option names are case-insensitive, as RawConfigParser has it
+    return option.lower()
+
+
+class Entries:
+    """
+    A read-only view of the rows in the database, supporting the read
+    operations of RawConfigParser used by the keyring.
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+
+    def _query(self, sql, *params):
+        with self._connect() as db:
+            return db.execute(sql, params).fetchall()
+
+    def sections(self):
+        return [
+            service
+            for (service,) in self._query(
+                'SELECT DISTINCT service FROM entries ORDER BY service'
+            )
+        ]
+
+    def has_section(self, section):
+        rows = self._query('SELECT 1 FROM entries WHERE service = ? LIMIT 1', section)
+        return bool(rows)
+
+    def options(self, section):
+        rows = self._query(
+            'SELECT username FROM entries WHERE service = ? ORDER BY username',
+            section,
+        )
+        if not rows:
+            raise configparser.NoSectionError(section)
+        return [username for (username,) in rows]
+
+    def has_option(self, section, option):
+        return bool(self._get(section, option))
+
+    def get(self, section, option):
+        rows = self._get(section, option)
+        if not rows:
+            if not self.has_section(section):
+                raise configparser.NoSectionError(section)
+            raise configparser.NoOptionError(option, section)
+        return rows[0][0]
+
+    def _get(self, section, option):
+        return self._query(
+            'SELECT value FROM entries WHERE service = ? AND username = ?',
+            section,
+            _optionxform(option),
+        )
+
+    def items(self):
+        """
+        Yield each section with a dict of its options, as used by
+        RawConfigParser.read_dict.
+        """
+        rows = self._query(
+            'SELECT service, username, value FROM entries ORDER BY service'
+        )
+        section, options = None, {}
+        for service, username, value in rows:
+            if service != section and options:
+                yield section, options
+                options = {}
+            section = service
+            options[username] = value
+        if options:
+            yield section, options
+
+
+class Keyring(file_base.AlternativeStorage, file_base.Keyring):
+    """
+    Base for keyrings storing passwords in an SQLite database at
+    `file_path`, in WAL mode so readers don't block each other or the
+    writer.
+
+    The `durability` policy maps onto SQLite's synchronous setting.
+    """
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """
+        Connect to the database, committing on success.
+        """
+        db = sqlite3.connect(self.file_path, timeout=30)
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(f'PRAGMA synchronous={SYNCHRONOUS[self.durability]}')
+            db.execute(SCHEMA)
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _read_config(self):
+        if not os.path.exists(self.file_path):
+            return configparser.RawConfigParser()
+        return Entries(self._connect)
+
+    _read_value = file_base.Keyring._config_value
+
+    def _iter_entries(self, section):
+        if not os.path.exists(self.file_path):
+            return
+        with self._connect() as db:
+            # the cursor fetches rows as they are consumed
+            if section is None:
+                yield from db.execute(
+                    'SELECT service, username, value FROM entries '
+                    'ORDER BY service, username'
+                )
+                return
+            yield from db.execute(
+                'SELECT service, username, value FROM entries '
+                'WHERE service = ? ORDER BY username',
+                (section,),
+            )
+
+    def _iter_prefix_entries(self, prefix):
+        if not os.path.exists(self.file_path):
+            return
+        with self._connect() as db:
+            # escaped names are ASCII, so this range holds all names
+            # starting with prefix, found in the primary key
+            yield from db.execute(
+                'SELECT service, username, value FROM entries '
+                'WHERE service >= ? AND service < ? ORDER BY service, username',
+                (prefix, prefix + '\x7f'),
+            )
+
+    def _write_changes(self, changes):
+        self._ensure_file_path()
+        with self._connect() as db:
+            _execute_changes(db, changes)
+
+    def _rewrite(self, transform):
+        self._ensure_file_path()
+        with self._connect() as db:
+            # hold the write lock from the read on, in one transaction
+            db.execute('BEGIN IMMEDIATE')
+            entries = Entries(lambda: contextlib.nullcontext(db))
+            _execute_changes(db, transform(entries))
+
+
+def _execute_changes(db, changes):
+    for section, option, value in changes:
+        key = section, _optionxform(option)
+        if value is None:
+            db.execute('DELETE FROM entries WHERE service = ? AND username = ?', key)
+            continue
+        db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?)', key + (value,))
+
+
+class PlaintextKeyring(Keyring, file.PlaintextKeyring):
+    """SQLite Keyring with no encryption"""
+
+    filename = 'keyring_pass.sqlite'
+
+
+class EncryptedKeyring(Keyring, file.EncryptedKeyring):
+    """PyCryptodome SQLite Keyring"""
+
+    filename = 'crypted_pass.sqlite'
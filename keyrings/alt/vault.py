@@ -0,0 +1,212 @@
+"""
+Keyrings sealing all passwords into a single encrypted vault file.
+
+The whole map of services, usernames and passwords is serialized and
+encrypted as one AES-GCM blob, under a master key derived from the
+password once per unlock. Unlocking decrypts the vault into memory, so
+lookups are dictionary hits, and every change re-seals the vault and
+atomically replaces the file. This suits read-heavy use, since each
+change re-encrypts and rewrites all the passwords.
+
+Importing this module makes the vault keyring known to keyring, ranked
+just below the encrypted INI keyring, so keyring won't pick it by
+itself. Configure it instead with
+``default-keyring=keyrings.alt.vault.EncryptedKeyring``.
+"""
+
+import configparser
+import getpass
+import json
+import os
+from base64 import b64decode
+
+from jaraco.classes import properties
+
+from . import file, file_base
+
+
+class EncryptedKeyring(file.Encrypted, file_base.Keyring):
+    """PyCryptodome Sealed Vault Keyring"""
+
+    filename = 'crypted_pass.vault'
+    scheme = '[PBKDF2] AES256.GCM'
+    version = '1.0'
+
+    _master = None
+    "The password, salt and KDF the master key was derived from, and the key."
+
+    @properties.classproperty
+    def priority(cls):
+        "Applicable wherever the encrypted file keyring is, but ranked below it."
+        return file.EncryptedKeyring.priority - 0.05
+
+    @properties.NonDataProperty
+    def keyring_key(self):
+        if os.path.exists(self.file_path):
+            self.keyring_key = getpass.getpass(
+                'Please enter password for encrypted keyring: '
+            )
+        else:
+            self.keyring_key = self._get_new_password()
+        return self.keyring_key
+
+    def _master_key(self, salt, kdf):
+        """
+        Return the master key, derived from the keyring password and the
+        salt of the vault only once for as long as neither changes.
+        """
+        password = self.keyring_key
+        if self._master is None or self._master[:3] != (password, salt, kdf):
+            self._master = password, salt, kdf, self._derive_key(password, salt, kdf)
+        return self._master[3]
+
+    def encrypt(self, password, assoc=None):
+        """The vault is encrypted as a whole; return the password itself."""
+        return password
+
+    def decrypt(self, password_encrypted, assoc=None):
+        """The vault is encrypted as a whole; return the password itself."""
+        return password_encrypted
+
+    def _encode_password(self, service, username, password):
+        self._check_password(username, password)
+        return password
+
+    def _decode_password(self, service, username, value):
+        return value
+
+    _read_value = file_base.Keyring._config_value
+    _iter_entries = file_base.Keyring._config_entries
+
+    def _read_config(self):
+        """
+        Load the passwords from the vault, unsealing it only when it has
+        changed on disk.
+        """
+        key = self._config_key()
+        cached_key, config = self._config_cache
+        if config is not None and key == cached_key:
+            return config
+        config = configparser.RawConfigParser()
+        if key[0] is not None:
+            with self._locked():
+                key = self._config_key()
+                with open(self.file_path, 'rb') as vault_file:
+                    data = vault_file.read()
+            # prompt and derive the key once the lock is released
+            config.read_dict(self._unseal(data))
+        self._config_cache = key, config
+        return config
+
+    def _unseal(self, data):
+        """
+        Decrypt and authenticate the vault in data, returning its sections.
+        """
+        vault = json.loads(data)
+        self.file_version = vault['version']
+        if (vault['scheme'], vault['version']) != (self.scheme, self.version):
+            raise ValueError(
+                f"Unsupported vault (exp.: {self.scheme} v.{self.version}, "
+                f"found: {vault['scheme']} v.{vault['version']})"
+            )
+        key = self._master_key(b64decode(vault['salt']), vault['kdf'])
+        sealed = b64decode(vault['sealed'])
+        salt = sealed[: self.salt_size]
+        nonce = sealed[self.salt_size : self.salt_size + file.NONCE_SIZE]
+        cipher = self._create_entry_cipher(key, salt, nonce, mode='GCM')
+        cipher.update(_header(vault))
+        try:
+            plaintext = cipher.decrypt_and_verify(
+                sealed[self.salt_size + file.NONCE_SIZE : -file.TAG_SIZE],
+                sealed[-file.TAG_SIZE :],
+            )
+        except ValueError:
+            # forget the password, so the next attempt prompts again
+            del self.keyring_key
+            self._master = None
+            raise ValueError("Incorrect Password")
+        return json.loads(plaintext)
+
+    def _seal(self, config):
+        """
+        Encrypt the sections of config into a vault, under the master key
+        of the vault read last, or a new one.
+        """
+        salt, kdf, key = self._sealing_key()
+        vault = dict(
+            scheme=self.scheme,
+            version=self.version,
+            kdf=kdf,
+            salt=file_base._encode(salt),
+        )
+        sections = {
+            section: dict(config.items(section)) for section in config.sections()
+        }
+        entry_salt = self.Random.get_random_bytes(self.salt_size)
+        nonce = self.Random.get_random_bytes(file.NONCE_SIZE)
+        cipher = self._create_entry_cipher(key, entry_salt, nonce, mode='GCM')
+        cipher.update(_header(vault))
+        encrypted, tag = cipher.encrypt_and_digest(json.dumps(sections).encode())
+        vault['sealed'] = file_base._encode(entry_salt + nonce + encrypted + tag)
+        return json.dumps(vault).encode()
+
+    def _sealing_key(self):
+        """
+        Return the salt, KDF and master key of the vault read last, or
+        new ones if there is none or the password changed.
+        """
+        if self._master is None or self._master[0] != self.keyring_key:
+            salt = self.Random.get_random_bytes(self.block_size)
+            self._master_key(salt, self._kdf_setting())
+        return self._master[1:]
+
+    def _write_changes(self, changes):
+        self._rewrite(lambda config: changes)
+
+    def _rewrite(self, transform):
+        # changes are never journaled; the vault is re-sealed as a whole
+        self._ensure_file_path()
+        # prompt and derive the key before taking the lock, unless another
+        # writer re-seals the vault under a new salt in between
+        self._read_config()
+        self._sealing_key()
+        with self._locked(exclusive=True):
+            config = self._read_config()
+            changes = transform(config)
+            # forget the cache first, so a failed write can't leave it stale
+            self._config_cache = None, None
+            file_base._apply_changes(config, changes)
+            with self._replace_file(self.file_path, binary=True) as vault_file:
+                vault_file.write(self._seal(config))
+            self._config_cache = self._config_key(), config
+
+    def _ensure_file_path(self):
+        # the vault file itself is created when first sealed
+        storage_root = os.path.dirname(self.file_path)
+        if storage_root:
+            os.makedirs(storage_root, exist_ok=True)
+
+    def import_file(self, path):
+        """
+        Copy the passwords from the encrypted INI keyring file at path,
+        such as ``crypted_pass.cfg``, into this vault.
+
+        The source must use the same password. Entries already in this
+        vault are replaced.
+        """
+        source = file.EncryptedKeyring()
+        source.file_path = path
+        source.keyring_key = self.keyring_key
+        source._check_key()
+        self.set_passwords({
+            (service, username): password
+            for service, username, password in source.export_all()
+        })
+
+
+def _header(vault):
+    """
+    Return the header of the vault as bound to the sealed passwords.
+    """
+    fields = [vault[name] for name in ('scheme', 'version', 'kdf', 'salt')]
+    return json.dumps(fields).encode()
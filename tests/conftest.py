@@ -0,0 +1,33 @@
+import pytest
+
+from keyrings.alt import file
+
+
+@pytest.fixture(autouse=True)
+def cheap_key_derivation(monkeypatch):
+    """
+    Keep deriving the keys of encrypted keyrings fast in tests.
+    """
+    monkeypatch.setattr(file.Encrypted, 'kdf_iterations', 1000)
+    monkeypatch.setattr(file.Encrypted, 'kdf_n', 2**10)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--perf',
+        action='store_true',
+        help="run the tests comparing timings, which are unreliable on busy hosts",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', "perf: compares timings; run with --perf")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--perf'):
+        return
+    skip = pytest.mark.skip(reason="timing comparison; run with --perf")
+    for item in items:
+        if 'perf' in item.keywords:
+            item.add_marker(skip)
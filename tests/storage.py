@@ -0,0 +1,137 @@
+"""
+Tests shared by the keyrings storing passwords other than in a single INI
+file: the SQLite, indexed, sharded and vault keyrings.
+"""
+
+import getpass
+import os
+import sys
+from unittest import mock
+
+import pytest
+from keyring.testing.backend import BackendBasicTests
+
+from keyrings.alt import file, file_base
+
+
+class StorageKeyringTests(BackendBasicTests):
+    file_name: str
+    "Name of the storage created in the temporary directory of each test."
+
+    file_keyring: type[file_base.Keyring] = file.PlaintextKeyring
+    "The INI keyring whose files the keyring imports."
+
+    @pytest.fixture(autouse=True)
+    def _init_properties_for_file(self, tmp_path):
+        self.keyring.file_path = str(tmp_path / self.file_name)
+
+    def test_empty_username(self):
+        with pytest.raises(ValueError):
+            self.set_password('service1', '', 'password1')
+
+    def test_username_case_insensitive(self):
+        self.set_password('system', 'User', 'password')
+        assert self.keyring.get_password('system', 'user') == 'password'
+
+    @pytest.mark.skipif(
+        sys.platform == 'win32',
+        reason="Group/World permissions aren't meaningful on Windows",
+    )
+    def test_keyring_not_created_world_writable(self):
+        self.set_password('system', 'user', 'password')
+        group_other_perms = os.stat(self.keyring.file_path).st_mode & 0o077
+        assert group_other_perms == 0
+
+    def test_iter(self):
+        passwords = {(f'service{n % 3}', f'user{n}'): f'password{n}' for n in range(10)}
+        self.keyring.set_passwords(passwords)
+        services = ['service0', 'service1', 'service2']
+        assert sorted(self.keyring.iter_services()) == services
+        assert sorted(self.keyring.iter_credentials()) == sorted(passwords)
+        assert sorted(self.keyring.iter_credentials('service1')) == sorted(
+            credential for credential in passwords if credential[0] == 'service1'
+        )
+        items = self.keyring.iter_items(decrypt=True)
+        assert {(service, username): pw for service, username, pw in items} == (
+            passwords
+        )
+        self.keyring.delete_passwords(passwords)
+
+    def test_find(self):
+        passwords = {
+            ('svc/prod/db-1', 'admin'): 'password1',
+            ('svc/prod/db-2', 'reader'): 'password2',
+            ('svc/production', 'admin'): 'password3',
+            ('svc/test/db-1', 'admin'): 'password4',
+        }
+        self.keyring.set_passwords(passwords)
+        assert sorted(self.keyring.find('svc/prod/')) == [
+            ('svc/prod/db-1', 'admin'),
+            ('svc/prod/db-2', 'reader'),
+        ]
+        assert list(self.keyring.find('svc/', 'read*')) == [('svc/prod/db-2', 'reader')]
+        with self.keyring.transaction():
+            self.keyring.set_password('svc/prod/db-3', 'admin', 'password5')
+            assert len(list(self.keyring.find('svc/prod/'))) == 3
+        self.keyring.delete_passwords([*passwords, ('svc/prod/db-3', 'admin')])
+        assert list(self.keyring.find()) == []
+
+    def test_import_file(self, tmp_path):
+        source = self.file_keyring()
+        source.file_path = str(tmp_path / 'keyring.cfg')
+        source.set_password('system', 'user', 'password')
+        self.keyring.import_file(source.file_path)
+        assert self.keyring.get_password('system', 'user') == 'password'
+        self.keyring.delete_password('system', 'user')
+
+
+class EncryptedStorageKeyringTests:
+    """
+    Tests of the encrypted variants, mixed in ahead of the tests of their
+    storage.
+    """
+
+    file_keyring: type[file_base.Keyring] = file.EncryptedKeyring
+
+    @pytest.fixture(autouse=True)
+    def crypt_fixture(self, monkeypatch):
+        fake_getpass = mock.Mock(return_value='abcdef')
+        monkeypatch.setattr(getpass, 'getpass', fake_getpass)
+
+    def test_wrong_password(self):
+        self.set_password('system', 'user', 'password')
+        getpass.getpass.return_value = 'wrong'
+        with pytest.raises(ValueError):
+            self.keyring._unlock()
+
+    @pytest.mark.parametrize('executor', ['', 'thread', 'process'])
+    def test_rekey(self, executor):
+        if executor:
+            self.keyring.bulk_workers = 2
+            self.keyring.bulk_executor = executor
+        passwords = {(f'service{n}', 'user'): f'password{n}' for n in range(20)}
+        self.keyring.set_passwords(passwords)
+        self.keyring.rekey('new password')
+        assert self.keyring.get_passwords(passwords) == passwords
+        getpass.getpass.return_value = 'new password'
+        other = type(self.keyring)()
+        other.file_path = self.keyring.file_path
+        assert other.get_passwords(passwords) == passwords
+        self.keyring.delete_passwords(passwords)
+
+    @pytest.mark.parametrize('executor', ['thread', 'process'])
+    def test_bulk_workers(self, executor):
+        self.keyring.bulk_workers = 2
+        self.keyring.bulk_executor = executor
+        passwords = {('system', f'user{n}'): f'password{n}' for n in range(20)}
+        self.keyring.set_passwords(passwords)
+        assert self.keyring.get_passwords([*passwords, ('system', 'x')]) == {
+            **passwords,
+            ('system', 'x'): None,
+        }
+        exported = {
+            (service, username): password
+            for service, username, password in self.keyring.export_all()
+        }
+        assert exported == passwords
+        self.keyring.delete_passwords(passwords)
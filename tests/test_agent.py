@@ -0,0 +1,153 @@
+import getpass
+import os
+import stat
+import subprocess
+import sys
+import time
+from unittest import mock
+
+import pytest
+
+from keyrings.alt import file
+
+pytestmark = [
+    pytest.mark.skipif(sys.platform == 'win32', reason="Unix domain sockets required"),
+    pytest.mark.skipif(
+        not file.EncryptedKeyring.viable,
+        reason="EncryptedKeyring backend not viable",
+    ),
+]
+
+
+def start_agent(path, timeout):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'keyrings.alt.agent', path, '--timeout', timeout],
+        env=env,
+    )
+    deadline = time.monotonic() + 10
+    while not os.path.exists(path):
+        assert process.poll() is None, "agent exited"
+        assert time.monotonic() < deadline, "agent didn't start"
+        time.sleep(0.01)
+    return process
+
+
+@pytest.fixture
+def agent_socket(tmp_path):
+    from keyrings.alt import agent
+
+    path = str(tmp_path / 'agent.sock')
+    process = start_agent(path, '30')
+    yield path
+    agent.Client(path).stop()
+    assert process.wait(timeout=10) == 0
+
+
+@pytest.fixture
+def fake_getpass(monkeypatch):
+    fake_getpass = mock.Mock(return_value='abcdef')
+    monkeypatch.setattr(getpass, 'getpass', fake_getpass)
+    return fake_getpass
+
+
+def make_keyring(tmp_path, agent_socket):
+    keyring = file.EncryptedKeyring()
+    keyring.file_path = str(tmp_path / 'crypted_pass.cfg')
+    keyring.agent_socket = agent_socket
+    return keyring
+
+
+def test_socket_private(agent_socket):
+    assert stat.S_IMODE(os.stat(agent_socket).st_mode) == 0o600
+
+
+def test_unlock_from_agent(tmp_path, agent_socket, fake_getpass, monkeypatch):
+    make_keyring(tmp_path, agent_socket).set_password('system', 'user', 'password')
+    fake_getpass.reset_mock()
+    keyring = make_keyring(tmp_path, agent_socket)
+    PBKDF2 = mock.Mock(wraps=keyring.KDF.PBKDF2)
+    monkeypatch.setattr(keyring.KDF, 'PBKDF2', PBKDF2)
+    assert keyring.get_password('system', 'user') == 'password'
+    assert not fake_getpass.called
+    assert not PBKDF2.called
+
+
+def test_password_not_held(tmp_path, agent_socket, fake_getpass):
+    from keyrings.alt import agent
+
+    keyring = make_keyring(tmp_path, agent_socket)
+    keyring.set_password('system', 'user', 'password')
+    held = agent.Client(agent_socket).get(keyring.file_path)
+    assert 'abcdef' not in held
+    assert held == keyring._master[1:]
+    other = make_keyring(tmp_path, agent_socket)
+    assert other.get_password('system', 'user') == 'password'
+    assert other.keyring_key is None
+
+
+def test_rekeyed_elsewhere(tmp_path, agent_socket, fake_getpass):
+    make_keyring(tmp_path, agent_socket).set_password('system', 'user', 'password')
+    keyring = make_keyring(tmp_path, agent_socket)
+    assert keyring.get_password('system', 'user') == 'password'
+    make_keyring(tmp_path, agent_socket).rekey('new password')
+    fake_getpass.reset_mock()
+    # picks up the new key from the agent
+    assert keyring.get_password('system', 'user') == 'password'
+    assert not fake_getpass.called
+
+
+def test_import_file_prompts(tmp_path, agent_socket, fake_getpass):
+    source = make_keyring(tmp_path, None)
+    source.file_path = str(tmp_path / 'source.cfg')
+    source.set_password('system', 'user', 'password')
+    make_keyring(tmp_path, agent_socket).set_password('system', 'other', 'other')
+    keyring = make_keyring(tmp_path, agent_socket)
+    fake_getpass.reset_mock()
+    keyring.import_file(source.file_path)
+    assert fake_getpass.call_count == 1
+    assert keyring.get_password('system', 'user') == 'password'
+
+
+def test_unlock_stored(tmp_path, agent_socket, fake_getpass):
+    make_keyring(tmp_path, None).set_password('system', 'user', 'password')
+    make_keyring(tmp_path, agent_socket).get_password('system', 'user')
+    fake_getpass.reset_mock()
+    keyring = make_keyring(tmp_path, agent_socket)
+    assert keyring.get_password('system', 'user') == 'password'
+    assert not fake_getpass.called
+
+
+def test_stale_key_ignored(tmp_path, agent_socket, fake_getpass):
+    make_keyring(tmp_path, agent_socket).set_password('system', 'user', 'password')
+    # the file is replaced by a keyring with another password
+    os.remove(str(tmp_path / 'crypted_pass.cfg'))
+    fake_getpass.return_value = 'other'
+    make_keyring(tmp_path, None).set_password('system', 'user', 'password2')
+    fake_getpass.reset_mock()
+    keyring = make_keyring(tmp_path, agent_socket)
+    assert keyring.get_password('system', 'user') == 'password2'
+    assert fake_getpass.called
+
+
+def test_forget(tmp_path, agent_socket, fake_getpass):
+    from keyrings.alt import agent
+
+    keyring = make_keyring(tmp_path, agent_socket)
+    keyring.set_password('system', 'user', 'password')
+    assert agent.Client(agent_socket).get(keyring.file_path) is not None
+    agent.Client(agent_socket).forget(keyring.file_path)
+    assert agent.Client(agent_socket).get(keyring.file_path) is None
+
+
+def test_no_agent(tmp_path, fake_getpass):
+    keyring = make_keyring(tmp_path, str(tmp_path / 'missing.sock'))
+    keyring.set_password('system', 'user', 'password')
+    assert make_keyring(tmp_path, None).get_password('system', 'user') == 'password'
+
+
+def test_idle_timeout(tmp_path):
+    path = str(tmp_path / 'agent.sock')
+    process = start_agent(path, '0.2')
+    assert process.wait(timeout=10) == 0
+    assert not os.path.exists(path)
@@ -0,0 +1,41 @@
+import time
+
+from keyrings.alt.cache import Cache
+
+
+def test_max_size():
+    cache = Cache(max_size=2, ttl=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    # b was used least recently
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_ttl(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now)
+    cache = Cache(max_size=2, ttl=60)
+    cache.put('a', 1)
+    now += 59
+    assert cache.get('a') == 1
+    now += 2
+    assert cache.get('a') is None
+    assert cache.stats() == dict(hits=1, misses=1, size=0)
+
+
+def test_disabled():
+    cache = Cache(max_size=0, ttl=60)
+    assert not cache
+    cache.put('a', 1)
+    assert cache.get('a') is None
+
+
+def test_clear():
+    cache = Cache(max_size=2, ttl=60)
+    cache.put('a', 1)
+    cache.clear()
+    assert cache.get('a') is None
@@ -0,0 +1,97 @@
+import random
+import re
+import timeit
+
+import pytest
+
+from keyrings.alt import escape
+
+
+def reference_escape(value):
+    # the byte-by-byte implementation escape replaced
+    return "".join(escape._escape_char(c) for c in value.encode('utf-8'))
+
+
+def reference_unescape(value):
+    pattern = escape.ESCAPE_FMT.replace('%02X', '(?P<code>[0-9A-Fa-f]{2})')
+    re_esc = re.compile(pattern.encode('ascii'))
+    return re_esc.sub(
+        lambda match: bytes([int(match.group('code'), 16)]), value.encode('ascii')
+    ).decode('utf-8')
+
+
+ALPHABETS = dict(
+    ascii='abcdefghijklmnopqrstuvwxyz0123456789-_./@ ',
+    non_ascii='äöüßéèñøåæœ€日本語한국어Ελληνικάкириллица🔑',
+)
+
+
+def random_text(rng, alphabet, max_length=40):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        value = random_text(rng, ALPHABETS['ascii'] + ALPHABETS['non_ascii'])
+        escaped = escape.escape(value)
+        assert escaped == reference_escape(value)
+        assert re.fullmatch('[A-Za-z0-9_]*', escaped)
+        assert escape.unescape(escaped) == value == reference_unescape(escaped)
+
+
+def test_all_bytes():
+    for byte in range(128):
+        assert escape.escape(chr(byte)) == escape._escape_char(byte)
+
+
+def test_unescape_lowercase():
+    assert escape.unescape('a_2fb_c3_a4') == 'a/bä'
+
+
+@pytest.mark.parametrize('value', ['_', 'a_', 'a_2', 'a_zz_2F', 'a\\x2F_2F', 'a\\_2F'])
+def test_unescape_unescaped(value):
+    assert escape.unescape(value) == reference_unescape(value)
+
+
+def test_unescape_non_ascii():
+    with pytest.raises(UnicodeEncodeError):
+        escape.unescape('ä')
+
+
+def bench(func, values):
+    return min(timeit.repeat(lambda: list(map(func, values)), number=10, repeat=5))
+
+
+@pytest.fixture(params=sorted(ALPHABETS))
+def names(request):
+    """
+    Service and user names, distinct so the memo doesn't apply.
+    """
+    rng = random.Random(0)
+    alphabet = ALPHABETS[request.param]
+    return [f'{random_text(rng, alphabet, 30)}{n}' for n in range(500)]
+
+
+@pytest.mark.perf
+def test_benchmark_escape(names):
+    new = bench(escape.escape.__wrapped__, names)
+    old = bench(reference_escape, names)
+    assert new < old, f"escape: {new:.4f}s, previously {old:.4f}s"
+
+
+@pytest.mark.perf
+def test_benchmark_unescape(names):
+    escaped = list(map(escape.escape, names))
+    new = bench(escape.unescape.__wrapped__, escaped)
+    old = bench(reference_unescape, escaped)
+    assert new < old, f"unescape: {new:.4f}s, previously {old:.4f}s"
+
+
+@pytest.mark.perf
+def test_benchmark_memo(names):
+    names = names[:50]
+    escaped = list(map(escape.escape, names))
+    assert bench(escape.escape, names) < bench(escape.escape.__wrapped__, names)
+    assert bench(escape.unescape, escaped) < bench(escape.unescape.__wrapped__, escaped)
@@ -1,9 +1,17 @@
+import base64
 import configparser
 import errno
 import getpass
+import glob
+import itertools
+import json
 import os
+import pickle
+import random
+import subprocess
 import sys
 import tempfile
+import threading
 from unittest import mock
 
 import pytest
@@ -11,7 +19,7 @@ from keyring.errors import PasswordDeleteError
 from keyring.testing.backend import BackendBasicTests
 from keyring.testing.util import random_string
 
-from keyrings.alt import file
+from keyrings.alt import file, file_base
 from keyrings.alt.escape import escape as escape_for_ini
 from keyrings.alt.file_base import encodebytes
 
@@ -31,6 +39,8 @@ class FileKeyringTests(BackendBasicTests):
             e = sys.exc_info()[1]
             if e.errno != errno.ENOENT:  # No such file or directory
                 raise
+        for path in glob.glob(self.keyring.file_path + '.*'):
+            os.remove(path)
 
     def get_config(self):
         # setting a password triggers keyring file creation
@@ -151,10 +161,191 @@ class FileKeyringTests(BackendBasicTests):
         self.save_config(config)
         assert self.keyring._check_version(config) is False
 
+    def test_config_cached(self, monkeypatch):
+        self.set_password('system', 'user', 'password')
+        assert self.keyring.get_password('system', 'user') == 'password'
+        read = mock.Mock(side_effect=AssertionError("file was re-read"))
+        monkeypatch.setattr(configparser.RawConfigParser, 'read', read)
+        assert self.keyring.get_password('system', 'user') == 'password'
+        assert self.keyring.get_password('system', 'other') is None
+
+    def test_config_cache_invalidated(self):
+        self.keyring.set_password('system', 'user', 'password')
+        assert self.keyring.get_password('system', 'user') == 'password'
+        config = self.get_config()
+        config.remove_option('system', 'user')
+        self.save_config(config)
+        assert self.keyring.get_password('system', 'user') is None
+
     def test_empty_username(self):
         with pytest.raises(ValueError):
             self.set_password('service1', '', 'password1')
 
+    def test_batch(self, monkeypatch):
+        # generate keyring
+        self.set_password('system', 'user', 'password')
+        save_config = mock.Mock(wraps=self.keyring._save_config)
+        monkeypatch.setattr(self.keyring, '_save_config', save_config)
+        passwords = {
+            ('system', 'user1'): 'password1',
+            ('system', 'user2'): 'password2',
+            ('other', 'user1'): 'password3',
+        }
+        self.keyring.set_passwords(passwords)
+        assert save_config.call_count == 1
+        assert self.keyring.get_passwords([*passwords, ('system', 'x')]) == {
+            **passwords,
+            ('system', 'x'): None,
+        }
+        self.keyring.delete_passwords([('system', 'user1'), ('other', 'user1')])
+        assert save_config.call_count == 2
+        assert self.keyring.get_password('system', 'user2') == 'password2'
+        self.keyring.delete_password('system', 'user2')
+
+    def test_transaction(self, monkeypatch):
+        # generate keyring
+        self.keyring.set_password('system', 'user', 'password')
+        save_config = mock.Mock(wraps=self.keyring._save_config)
+        monkeypatch.setattr(self.keyring, '_save_config', save_config)
+        with self.keyring.transaction():
+            self.keyring.set_password('system', 'user2', 'password2')
+            self.keyring.delete_password('system', 'user')
+            assert self.keyring.get_password('system', 'user2') == 'password2'
+            assert save_config.call_count == 0
+        assert save_config.call_count == 1
+        assert self.keyring.get_password('system', 'user') is None
+        assert self.keyring.get_password('system', 'user2') == 'password2'
+        self.keyring.delete_password('system', 'user2')
+
+    def test_transaction_discarded(self):
+        self.set_password('system', 'user', 'password')
+        with pytest.raises(RuntimeError), self.keyring.transaction():
+            self.keyring.set_password('system', 'user', 'changed')
+            raise RuntimeError()
+        assert self.keyring.get_password('system', 'user') == 'password'
+
+    def test_iter(self, monkeypatch):
+        passwords = {
+            ('system', 'User1'): 'password1',
+            ('system', 'user2'): 'password2',
+            ('sérvice/2', 'Üser'): 'password3',
+        }
+        self.keyring.set_passwords(passwords)
+        decrypt = mock.Mock(wraps=self.keyring.decrypt)
+        monkeypatch.setattr(self.keyring, 'decrypt', decrypt)
+        assert list(self.keyring.iter_services()) == ['system', 'sérvice/2']
+        # usernames match case-insensitively, and are stored with ASCII
+        # letters in lower case
+        assert list(self.keyring.iter_credentials()) == [
+            ('system', 'user1'),
+            ('system', 'user2'),
+            ('sérvice/2', 'Üser'),
+        ]
+        assert list(self.keyring.iter_credentials('system')) == [
+            ('system', 'user1'),
+            ('system', 'user2'),
+        ]
+        assert list(self.keyring.iter_credentials('missing')) == []
+        stored = list(self.keyring.iter_items())
+        config = self.get_config()
+        assert [value.strip() for _, _, value in stored] == [
+            config.get(escape_for_ini(service), escape_for_ini(username)).strip()
+            for service, username, _ in stored
+        ]
+        assert not decrypt.called
+        assert list(self.keyring.iter_items(decrypt=True)) == [
+            ('system', 'user1', 'password1'),
+            ('system', 'user2', 'password2'),
+            ('sérvice/2', 'Üser', 'password3'),
+        ]
+
+    def test_iter_streams(self, monkeypatch):
+        self.keyring.set_password('system', 'user1', 'password1')
+        # another keyring changes the file
+        other = type(self.keyring)()
+        other.file_path = self.keyring.file_path
+        other.set_password('system', 'user2', 'password2')
+        read_config = mock.Mock(wraps=self.keyring._read_config)
+        monkeypatch.setattr(self.keyring, '_read_config', read_config)
+        credentials = self.keyring.iter_credentials()
+        assert next(credentials) == ('system', 'user1')
+        assert list(credentials) == [('system', 'user2')]
+        assert not read_config.called
+
+    def test_iter_unsupported(self):
+        self.keyring.set_password('system', 'user', 'password')
+        with open(self.keyring.file_path, 'a', encoding='utf-8') as config_file:
+            config_file.write('[DEFAULT]\n[other]\nuser = cGFzc3dvcmQ=\n')
+        assert list(self.keyring.iter_credentials())[-2:] == [
+            ('system', 'user'),
+            ('other', 'user'),
+        ]
+
+    def test_find(self, monkeypatch):
+        passwords = {
+            ('svc/prod/db-1', 'admin'): 'password1',
+            ('svc/prod/db-2', 'Reader'): 'password2',
+            ('svc/prod/web', 'admin'): 'password3',
+            ('svc/production', 'admin'): 'password4',
+            ('svc/test/db-1', 'admin'): 'password5',
+            ('other', 'admin'): 'password6',
+        }
+        self.keyring.set_passwords(passwords)
+        decrypt = mock.Mock(wraps=self.keyring.decrypt)
+        monkeypatch.setattr(self.keyring, 'decrypt', decrypt)
+        unescape = mock.Mock(wraps=file_base.unescape)
+        monkeypatch.setattr(file_base, 'unescape', unescape)
+        assert sorted(self.keyring.find('svc/prod/')) == [
+            ('svc/prod/db-1', 'admin'),
+            ('svc/prod/db-2', 'reader'),
+            ('svc/prod/web', 'admin'),
+        ]
+        # only the entries of matching services are unescaped
+        assert unescape.call_count == 6
+        assert list(self.keyring.find('svc/prod/db-', 'READ*')) == [
+            ('svc/prod/db-2', 'reader'),
+        ]
+        assert len(list(self.keyring.find())) == len(passwords)
+        assert list(self.keyring.find('missing')) == []
+        assert not decrypt.called
+        # the index follows changes
+        self.keyring.set_password('svc/prod/db-3', 'admin', 'password7')
+        self.keyring.delete_password('svc/prod/web', 'admin')
+        assert sorted(self.keyring.find('svc/prod/', 'admin')) == [
+            ('svc/prod/db-1', 'admin'),
+            ('svc/prod/db-3', 'admin'),
+        ]
+
+    def test_get_credential_any_username(self, monkeypatch):
+        self.keyring.set_passwords({
+            ('system', 'user1'): 'password1',
+            ('system', 'user2'): 'password2',
+            ('other', 'user3'): 'password3',
+        })
+        decrypt = mock.Mock(wraps=self.keyring.decrypt)
+        monkeypatch.setattr(self.keyring, 'decrypt', decrypt)
+        credential = self.keyring.get_credential('system', None)
+        assert (credential.username, credential.password) == ('user1', 'password1')
+        assert decrypt.call_count == 1
+        assert self.keyring.get_credential('missing', None) is None
+        self.keyring.delete_password('system', 'user1')
+        credential = self.keyring.get_credential('system', None)
+        assert (credential.username, credential.password) == ('user2', 'password2')
+        self.keyring.delete_passwords([('system', 'user2'), ('other', 'user3')])
+        assert self.keyring.get_credential('system', None) is None
+
+    def test_iter_transaction(self):
+        with self.keyring.transaction():
+            self.keyring.set_password('system', 'user', 'password')
+            assert ('system', 'user') in self.keyring.iter_credentials()
+        self.keyring.delete_password('system', 'user')
+
+    def test_batch_delete_missing(self):
+        self.set_password('system', 'user', 'password')
+        with pytest.raises(PasswordDeleteError):
+            self.keyring.delete_passwords([('system', 'user'), ('system', 'xxxx')])
+        assert self.keyring.get_password('system', 'user') == 'password'
+
 
 @pytest.fixture(scope="class")
 def monkeyclass(request):
@@ -192,12 +383,333 @@ class TestEncryptedFileKeyring(FileKeyringTests):
     def init_keyring(self):
         return file.EncryptedKeyring()
 
+    def test_init_file_written_once(self, monkeypatch):
+        save_config = mock.Mock(wraps=self.keyring._save_config)
+        monkeypatch.setattr(self.keyring, '_save_config', save_config)
+        self.keyring._init_file()
+        assert save_config.call_count == 1
+        assert self.keyring._check_file() is True
+
     def test_wrong_password(self):
         self.set_password('system', 'user', 'password')
         getpass.getpass.return_value = 'wrong'
         with pytest.raises(ValueError):
             self.keyring._unlock()
 
+    def test_key_derived_once(self, monkeypatch):
+        self.set_password('system', 'user1', 'password1')
+        self.set_password('system', 'user2', 'password2')
+        self.keyring._lock()
+        PBKDF2 = mock.Mock(wraps=self.keyring.KDF.PBKDF2)
+        monkeypatch.setattr(self.keyring.KDF, 'PBKDF2', PBKDF2)
+        assert self.keyring.get_password('system', 'user1') == 'password1'
+        assert self.keyring.get_password('system', 'user2') == 'password2'
+        assert PBKDF2.call_count == 1
+
+    def test_kdf_recorded(self):
+        self.set_password('system', 'user', 'password')
+        config = self.get_config()
+        setting = escape_for_ini('keyring-setting')
+        assert config.get(setting, 'kdf') == 'pbkdf2-sha256 iterations=1000'
+
+    def test_scrypt(self):
+        self.keyring.kdf = 'scrypt'
+        self.set_password('system', 'user', 'password')
+        config = self.get_config()
+        setting = escape_for_ini('keyring-setting')
+        assert config.get(setting, 'kdf') == 'scrypt n=1024 r=8 p=1'
+        # the file's key derivation applies, whatever the reader's
+        other = file.EncryptedKeyring()
+        other.file_path = self.keyring.file_path
+        assert other.get_password('system', 'user') == 'password'
+
+    def test_unknown_kdf(self):
+        self.keyring.kdf = 'md5'
+        with pytest.raises(ValueError):
+            self.keyring.set_password('system', 'user', 'password')
+
+    @pytest.mark.parametrize(
+        'kdf, param', [('pbkdf2-sha256', 'iterations'), ('scrypt', 'n')]
+    )
+    def test_calibrate(self, kdf, param):
+        self.keyring.kdf = kdf
+        setting = self.keyring.calibrate(0.01)
+        cost = getattr(self.keyring, 'kdf_' + param)
+        assert f'{param}={cost}' in setting.split()
+        if param == 'n':
+            assert cost & (cost - 1) == 0
+
+    def test_gcm(self, monkeypatch):
+        self.keyring.scheme = '[PBKDF2] AES256.GCM'
+        self.set_password('system', 'User', 'password')
+        decrypt = mock.Mock(wraps=self.keyring.decrypt)
+        monkeypatch.setattr(self.keyring, 'decrypt', decrypt)
+        assert self.keyring.get_password('system', 'user') == 'password'
+        assert decrypt.call_count == 1
+        encrypted = base64.b64decode(self.get_config().get('system', 'user'))
+        assert encrypted[0] == file.ENVELOPE_GCM_AAD
+
+    def test_gcm_entry_moved(self):
+        self.keyring.scheme = '[PBKDF2] AES256.GCM'
+        self.set_password('system', 'user', 'password')
+        config = self.get_config()
+        config.set('system', 'other', config.get('system', 'user'))
+        self.save_config(config)
+        with pytest.raises(ValueError):
+            self.keyring.get_password('system', 'other')
+
+    def test_gcm_without_assoc(self):
+        self.keyring.scheme = '[PBKDF2] AES256.GCM'
+        encrypted = self.keyring.encrypt(b'password')
+        assert self.keyring.decrypt(encrypted, b'ignored') == b'password'
+
+    def test_mixed_schemes(self):
+        self.set_password('system', 'cfb', 'password1')
+        self.keyring.scheme = '[PBKDF2] AES256.GCM'
+        self.set_password('system', 'gcm', 'password2')
+        other = file.EncryptedKeyring()
+        other.file_path = self.keyring.file_path
+        assert other.get_password('system', 'cfb') == 'password1'
+        assert other.get_password('system', 'gcm') == 'password2'
+
+    def test_envelope(self):
+        encrypted = self.keyring.encrypt(b'password')
+        assert encrypted[0] == file.ENVELOPE_CFB
+        # salt, IV and the prefixed password
+        assert len(encrypted) == 1 + 16 + 16 + len(b'pw:password')
+
+    def test_json_envelope(self):
+        self.set_password('system', 'user', 'password')
+        keyring = self.keyring
+        salt = keyring.Random.get_random_bytes(keyring.salt_size)
+        IV = keyring.Random.get_random_bytes(keyring.AES.block_size)
+        cipher = keyring._create_entry_cipher(keyring._master_key(), salt, IV)
+        data = dict(salt=salt, IV=IV, password_encrypted=cipher.encrypt(b'pw:password'))
+        data = {name: encodebytes(value).decode() for name, value in data.items()}
+        encrypted = json.dumps(data).encode()
+        assert keyring.decrypt(encrypted) == b'password'
+
+    def test_unknown_envelope(self):
+        encrypted = self.keyring.encrypt(b'password')
+        with pytest.raises(ValueError):
+            self.keyring.decrypt(b'\x7f' + encrypted[1:])
+
+    def test_caches(self, monkeypatch):
+        self.keyring.key_cache_size = 10
+        self.keyring.plaintext_cache_size = 10
+        self.set_password('system', 'user', 'password')
+        self.keyring._lock()
+        misses = self.keyring.cache_stats()['keys']['misses']
+        HKDF = mock.Mock(wraps=self.keyring.KDF.HKDF)
+        monkeypatch.setattr(self.keyring.KDF, 'HKDF', HKDF)
+        assert self.keyring.get_password('system', 'user') == 'password'
+        assert self.keyring.get_password('system', 'user') == 'password'
+        # one for the key check on unlock, one for the entry
+        assert HKDF.call_count == 2
+        stats = self.keyring.cache_stats()
+        assert stats['plaintexts']['hits'] == 1
+        assert stats['keys']['misses'] == misses + 1
+        self.keyring._lock()
+        assert self.keyring.cache_stats()['plaintexts']['size'] == 0
+        assert self.keyring.cache_stats()['keys']['size'] == 0
+
+    def test_plaintext_cache_bound_to_password(self):
+        self.keyring.scheme = '[PBKDF2] AES256.GCM'
+        self.keyring.plaintext_cache_size = 10
+        self.set_password('system', 'user', 'password')
+        assert self.keyring.get_password('system', 'user') == 'password'
+        self.keyring.keyring_key = 'wrong'
+        with pytest.raises(ValueError):
+            self.keyring.get_password('system', 'user')
+        assert self.keyring.cache_stats()['plaintexts']['size'] == 0
+        self.keyring.keyring_key = 'abcdef'
+        assert self.keyring.get_password('system', 'user') == 'password'
+
+    def test_plaintext_cache_bound_to_assoc(self):
+        self.keyring.scheme = '[PBKDF2] AES256.GCM'
+        self.keyring.plaintext_cache_size = 10
+        self.set_password('system', 'user', 'password')
+        assert self.keyring.get_password('system', 'user') == 'password'
+        config = self.get_config()
+        config.set('system', 'other', config.get('system', 'user'))
+        self.save_config(config)
+        with pytest.raises(ValueError):
+            self.keyring.get_password('system', 'other')
+
+    def test_key_check(self, monkeypatch):
+        self.set_password('system', 'user', 'password')
+        config = self.get_config()
+        assert config.has_option(escape_for_ini('keyring-setting'), 'check')
+        self.keyring._lock()
+        decrypt = mock.Mock(wraps=self.keyring.decrypt)
+        monkeypatch.setattr(self.keyring, 'decrypt', decrypt)
+        self.keyring._unlock()
+        getpass.getpass.return_value = 'wrong'
+        with pytest.raises(ValueError):
+            self.keyring._unlock()
+        assert not decrypt.called
+
+    def test_without_key_check(self):
+        self.set_password('system', 'user', 'password')
+        config = self.get_config()
+        config.remove_option(escape_for_ini('keyring-setting'), 'check')
+        self.save_config(config)
+        self.keyring._lock()
+        self.keyring._unlock()
+        getpass.getpass.return_value = 'wrong'
+        with pytest.raises(ValueError):
+            self.keyring._unlock()
+
+    @pytest.mark.parametrize('executor', ['thread', 'process'])
+    def test_bulk_workers(self, executor):
+        self.keyring.bulk_workers = 2
+        self.keyring.bulk_executor = executor
+        self.keyring.scheme = '[PBKDF2] AES256.GCM'
+        passwords = {('system', f'user{n}'): f'password{n}' for n in range(20)}
+        self.keyring.set_passwords(passwords)
+        assert self.keyring.get_passwords([*passwords, ('system', 'x')]) == {
+            **passwords,
+            ('system', 'x'): None,
+        }
+        exported = {
+            (service, username): password
+            for service, username, password in self.keyring.export_all()
+        }
+        assert exported == passwords
+
+    def test_pickle(self):
+        self.keyring.set_password('system', 'user', 'password')
+        encrypted = self.keyring.encrypt(b'password', b'assoc')
+        copy = pickle.loads(pickle.dumps(self.keyring))
+        # the copy doesn't need the file
+        os.remove(self.keyring.file_path)
+        assert copy.decrypt(encrypted, b'assoc') == b'password'
+
+    @pytest.mark.parametrize('executor', ['', 'thread', 'process'])
+    def test_rekey(self, executor):
+        if executor:
+            self.keyring.bulk_workers = 2
+            self.keyring.bulk_executor = executor
+        passwords = {('system', f'user{n}'): f'password{n}' for n in range(10)}
+        self.keyring.set_passwords(passwords)
+        self.keyring.rekey('new password')
+        assert self.keyring.get_passwords(passwords) == passwords
+        old = file.EncryptedKeyring()
+        old.file_path = self.keyring.file_path
+        with pytest.raises(ValueError):
+            old.get_password('system', 'user0')
+        getpass.getpass.return_value = 'new password'
+        new = file.EncryptedKeyring()
+        new.file_path = self.keyring.file_path
+        assert new.get_passwords(passwords) == passwords
+
+    def test_rekey_blank(self):
+        with pytest.raises(ValueError):
+            self.keyring.rekey(' ')
+
+    def test_rekey_interrupted(self, monkeypatch):
+        passwords = {('system', f'user{n}'): f'password{n}' for n in range(10)}
+        self.keyring.set_passwords(passwords)
+        with open(self.keyring.file_path, 'rb') as config_file:
+            before = config_file.read()
+        calls = itertools.count()
+        reencrypt = file.EncryptedKeyring._reencrypt
+
+        def interrupted(*args):
+            if next(calls) == 5:
+                raise KeyboardInterrupt()
+            return reencrypt(*args)
+
+        monkeypatch.setattr(file.EncryptedKeyring, '_reencrypt', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            self.keyring.rekey('new password')
+        monkeypatch.setattr(os, 'replace', mock.Mock(side_effect=OSError()))
+        with pytest.raises(OSError):
+            self.keyring.rekey('new password')
+        with open(self.keyring.file_path, 'rb') as config_file:
+            assert config_file.read() == before
+        other = file.EncryptedKeyring()
+        other.file_path = self.keyring.file_path
+        assert other.get_passwords(passwords) == passwords
+
+    def write_v1_file(self, passwords):
+        """
+        Write a version 1.0 keyring file holding passwords.
+        """
+        keyring = self.keyring
+
+        def encode(password):
+            salt = keyring.Random.get_random_bytes(keyring.block_size)
+            IV = keyring.Random.get_random_bytes(keyring.AES.block_size)
+            cipher = keyring._create_cipher('abcdef', salt, IV)
+            data = dict(
+                salt=salt,
+                IV=IV,
+                password_encrypted=cipher.encrypt(b'pw:' + password.encode()),
+            )
+            data = {name: encodebytes(value).decode() for name, value in data.items()}
+            return '\n' + encodebytes(json.dumps(data).encode()).decode()
+
+        config = configparser.RawConfigParser()
+        setting = escape_for_ini('keyring-setting')
+        config.add_section(setting)
+        config.set(setting, 'scheme', keyring.scheme)
+        config.set(setting, 'version', '1.0')
+        config.set(
+            setting,
+            escape_for_ini('password reference'),
+            encode('password reference value'),
+        )
+        for (service, username), password in passwords.items():
+            section = escape_for_ini(service)
+            config.has_section(section) or config.add_section(section)
+            config.set(section, escape_for_ini(username), encode(password))
+        self.save_config(config)
+
+    def test_migrate(self):
+        self.write_v1_file({('system', 'user'): 'password'})
+        assert self.keyring.get_password('system', 'user') == 'password'
+        config = self.get_config()
+        setting = escape_for_ini('keyring-setting')
+        assert config.get(setting, 'version') == '2.0'
+        assert config.has_option(setting, 'salt')
+        other = file.EncryptedKeyring()
+        other.file_path = self.keyring.file_path
+        assert other.get_password('system', 'user') == 'password'
+
+    @pytest.mark.skipif(file_base.fcntl is None, reason="Requires fcntl")
+    def test_migrate_read_only(self, monkeypatch):
+        self.write_v1_file({('system', 'user'): 'password'})
+        with open(self.keyring.file_path, 'rb') as config_file:
+            before = config_file.read()
+        os_open = os.open
+
+        def read_only_open(path, flags, *args):
+            if flags & os.O_CREAT:
+                raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), path)
+            return os_open(path, flags, *args)
+
+        monkeypatch.setattr(os, 'open', read_only_open)
+        assert self.keyring.get_password('system', 'user') == 'password'
+        assert self.keyring.get_passwords([('system', 'user')]) == {
+            ('system', 'user'): 'password'
+        }
+        with open(self.keyring.file_path, 'rb') as config_file:
+            assert config_file.read() == before
+
+    def test_import_file(self, tmp_path):
+        source = file.EncryptedKeyring()
+        source.file_path = str(tmp_path / 'source.cfg')
+        source.set_password('system', 'user', 'password')
+        self.keyring.import_file(source.file_path)
+        assert self.keyring.get_password('system', 'user') == 'password'
+        getpass.getpass.return_value = 'wrong'
+        other = file.EncryptedKeyring()
+        other.file_path = str(tmp_path / 'other.cfg')
+        other.set_password('system', 'user', 'password')
+        with pytest.raises(ValueError):
+            self.keyring.import_file(other.file_path)
+
     @pytest.mark.skipif(
         sys.platform == 'win32',
         reason="Group/World permissions aren't meaningful on Windows",
@@ -218,6 +730,78 @@ class TestUncryptedFileKeyring(FileKeyringTests):
     def init_keyring(self):
         return file.PlaintextKeyring()
 
+    def test_interrupted_write(self, monkeypatch):
+        self.set_password('system', 'user', 'password')
+
+        def write(config, config_file):
+            config_file.write('[system]\n')
+            raise KeyboardInterrupt()
+
+        monkeypatch.setattr(configparser.RawConfigParser, 'write', write)
+        with pytest.raises(KeyboardInterrupt):
+            self.keyring.set_password('system', 'user', 'changed')
+        monkeypatch.undo()
+        assert self.keyring.get_password('system', 'user') == 'password'
+        leftovers = set(glob.glob(self.keyring.file_path + '.*'))
+        assert leftovers <= {self.keyring.lock_path}
+
+    @pytest.mark.parametrize(
+        'durability, syncs', [('none', 0), ('file', 1), ('file+dir', 2)]
+    )
+    def test_durability(self, monkeypatch, durability, syncs):
+        self.set_password('system', 'user', 'password')
+        self.keyring.durability = durability
+        fsync = mock.Mock(wraps=os.fsync)
+        monkeypatch.setattr(os, 'fsync', fsync)
+        self.set_password('system', 'user', 'changed')
+        assert fsync.call_count == syncs
+
+    def test_unknown_durability(self):
+        self.keyring.durability = 'sometimes'
+        with pytest.raises(ValueError):
+            self.keyring.set_password('system', 'user', 'password')
+
+    def test_scan_before_parse(self, monkeypatch):
+        self.set_password('system', 'user', 'password')
+        self.set_password('system', 'other', 'password')
+        keyring = file.PlaintextKeyring()
+        keyring.file_path = self.keyring.file_path
+        reads = []
+        read = configparser.RawConfigParser.read
+
+        def counted_read(parser, *args, **kwargs):
+            reads.append(args)
+            return read(parser, *args, **kwargs)
+
+        monkeypatch.setattr(configparser.RawConfigParser, 'read', counted_read)
+        assert keyring.get_password('system', 'user') == 'password'
+        assert not reads
+        # a second lookup parses the file once and keeps it
+        assert keyring.get_password('system', 'other') == 'password'
+        assert keyring.get_password('system', 'missing') is None
+        assert len(reads) == 1
+
+    def test_get_credential_scans_section(self, monkeypatch):
+        self.keyring.set_password('system', 'user', 'password')
+        other = type(self.keyring)()
+        other.file_path = self.keyring.file_path
+        other.set_password('other', 'user', 'password')
+        read_config = mock.Mock(wraps=self.keyring._read_config)
+        monkeypatch.setattr(self.keyring, '_read_config', read_config)
+        assert self.keyring.get_credential('other', None).password == 'password'
+        assert not read_config.called
+
+    def test_batch_matches_single(self, tmp_path):
+        passwords = {('system', 'user1'): 'pw1', ('other', 'user\n2'): 'pw\n2'}
+        self.keyring.set_passwords(passwords)
+        single = file.PlaintextKeyring()
+        single.file_path = str(tmp_path / 'single.cfg')
+        for (service, username), password in passwords.items():
+            single.set_password(service, username, password)
+        with open(single.file_path, encoding='utf-8') as expected:
+            with open(self.keyring.file_path, encoding='utf-8') as actual:
+                assert actual.read() == expected.read()
+
     @pytest.mark.skipif(
         sys.platform == 'win32',
         reason="Group/World permissions aren't meaningful on Windows",
@@ -232,3 +816,250 @@ class TestUncryptedFileKeyring(FileKeyringTests):
         assert os.path.exists(self.keyring.file_path)
         group_other_perms = os.stat(self.keyring.file_path).st_mode & 0o077
         assert group_other_perms == 0
+
+
+def random_text(rng, min_length, max_length):
+    alphabet = 'aB1 =:#;[]\n\t_\u00e9'
+    return ''.join(rng.choices(alphabet, k=rng.randint(min_length, max_length)))
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_scan_value(seed, tmp_path):
+    """
+    Scanning for a value finds the same value as RawConfigParser.
+    """
+    rng = random.Random(seed)
+    config = configparser.RawConfigParser()
+    for _ in range(rng.randint(0, 5)):
+        section = escape_for_ini(random_text(rng, 1, 4))
+        config.has_section(section) or config.add_section(section)
+        for _ in range(rng.randint(0, 5)):
+            option = escape_for_ini(random_text(rng, 1, 4))
+            config.set(section, option, random_text(rng, 0, 30))
+    path = tmp_path / 'keyring.cfg'
+    with open(path, 'w', encoding='utf-8') as config_file:
+        config.write(config_file)
+
+    parsed = configparser.RawConfigParser()
+    try:
+        parsed.read(path, encoding='utf-8')
+    except configparser.Error:
+        # values may contain lines that read back as duplicate options
+        return
+    sections = [*parsed.sections(), 'missing']
+    options = {
+        option for section in parsed.sections() for option in parsed.options(section)
+    }
+    options |= {option.upper() for option in options} | {'missing'}
+    for section, option in itertools.product(sections, options):
+        expected = file_base._get_value(parsed, section, option)
+        with open(path, encoding='utf-8') as lines:
+            assert file_base._scan_value(lines, section, option) == expected
+    with open(path, encoding='utf-8') as lines:
+        assert list(file_base._scan_items(lines)) == [
+            (section, option, parsed.get(section, option))
+            for section in parsed.sections()
+            for option in parsed.options(section)
+        ]
+
+
+def test_scan_value_stops_early():
+    def lines():
+        yield '[system]\n'
+        yield 'user = first\n'
+        yield '\tsecond\n'
+        yield 'other = value\n'
+        raise AssertionError("read past the value")
+
+    assert file_base._scan_value(lines(), 'system', 'USER') == 'first\nsecond'
+
+
+CONCURRENT_WRITER = """
+import sys
+from keyrings.alt import file
+keyring = file.PlaintextKeyring()
+keyring.file_path, name, count, keyring.journal = sys.argv[1:]
+for n in range(int(count)):
+    keyring.set_password('stress', f'{name}-{n}', 'password')
+"""
+
+
+@pytest.mark.skipif(file_base.fcntl is None, reason="Requires fcntl")
+@pytest.mark.parametrize('journal', ['', 'journal'])
+def test_concurrent_writers(tmp_path, journal):
+    """
+    Concurrent read-modify-write cycles from several processes must not
+    lose updates.
+    """
+    path = str(tmp_path / 'keyring_pass.cfg')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    writers = [
+        subprocess.Popen(
+            [sys.executable, '-c', CONCURRENT_WRITER, path, str(n), '25', journal],
+            env=env,
+        )
+        for n in range(4)
+    ]
+    assert [writer.wait() for writer in writers] == [0] * len(writers)
+    keyring = file.PlaintextKeyring()
+    keyring.file_path = path
+    assert len(keyring._load_config().options('stress')) == 100
+
+
+@pytest.mark.skipif(file_base.fcntl is None, reason="Requires fcntl")
+def test_lock_wait(tmp_path):
+    keyring = file.PlaintextKeyring()
+    keyring.file_path = str(tmp_path / 'keyring_pass.cfg')
+    keyring.set_password('system', 'user', 'password')
+    with open(keyring.lock_path, 'w', encoding='utf-8') as lock:
+        file_base.fcntl.flock(lock, file_base.fcntl.LOCK_EX)
+        threading.Timer(0.1, lock.close).start()
+        keyring.set_password('system', 'user', 'password')
+    assert keyring.lock_wait >= 0.05
+
+
+@pytest.mark.skipif(file_base.fcntl is None, reason="Requires fcntl")
+@pytest.mark.parametrize('code', [errno.EACCES, errno.EROFS])
+def test_read_without_lock_file(tmp_path, monkeypatch, code):
+    """
+    A keyring in a directory the user can't write to can still be read.
+    """
+    keyring = file.PlaintextKeyring()
+    keyring.file_path = str(tmp_path / 'keyring_pass.cfg')
+    keyring.set_password('system', 'user', 'password')
+    os.remove(keyring.lock_path)
+    os_open = os.open
+
+    def read_only_open(path, flags, *args):
+        if flags & os.O_CREAT:
+            raise OSError(code, os.strerror(code), path)
+        return os_open(path, flags, *args)
+
+    monkeypatch.setattr(os, 'open', read_only_open)
+    other = file.PlaintextKeyring()
+    other.file_path = keyring.file_path
+    assert other.get_password('system', 'user') == 'password'
+    assert other.get_passwords([('system', 'user')]) == {('system', 'user'): 'password'}
+    with pytest.raises(OSError):
+        other.set_password('system', 'user', 'other')
+
+
+class TestJournaledFileKeyring(BackendBasicTests):
+    @pytest.fixture(autouse=True)
+    def _journal_files(self, tmp_path):
+        self.keyring.file_path = str(tmp_path / 'keyring_pass.cfg')
+
+    def init_keyring(self):
+        keyring = file.PlaintextKeyring()
+        keyring.journal = True
+        return keyring
+
+    def read_file(self):
+        with open(self.keyring.file_path, encoding='utf-8') as config_file:
+            return config_file.read()
+
+    def test_changes_appended_to_journal(self):
+        self.keyring.set_password('system', 'user', 'password')
+        self.keyring.delete_password('system', 'user')
+        assert self.read_file() == ''
+        with open(self.keyring.journal_path, encoding='utf-8') as journal:
+            assert len(journal.readlines()) == 2
+
+    def test_journal_replayed(self):
+        self.set_password('system', 'user', 'password')
+        other = file.PlaintextKeyring()
+        other.file_path = self.keyring.file_path
+        assert other.get_password('system', 'user') == 'password'
+
+    def test_compact(self):
+        self.set_password('system', 'user', 'password')
+        self.keyring.compact()
+        assert not os.path.exists(self.keyring.journal_path)
+        assert '[system]' in self.read_file()
+        assert self.keyring.get_password('system', 'user') == 'password'
+
+    def test_compact_threshold(self):
+        self.set_password('system', 'user', 'password')
+        self.keyring.journal_min_size = 0
+        self.keyring.journal_max_ratio = 0
+        self.set_password('system', 'user', 'other')
+        assert not os.path.exists(self.keyring.journal_path)
+        self.keyring.journal_max_ratio = 2
+        self.set_password('system', 'user', 'third')
+        assert os.path.exists(self.keyring.journal_path)
+        assert self.keyring.get_password('system', 'user') == 'third'
+
+    def test_settings_as_strings(self):
+        # as set through KEYRING_PROPERTY_* environment variables
+        self.keyring.journal = '0'
+        self.set_password('system', 'user', 'password')
+        assert not os.path.exists(self.keyring.journal_path)
+        self.keyring.journal = 'true'
+        self.keyring.journal_min_size = '0'
+        self.keyring.journal_max_ratio = '2.5'
+        self.set_password('system', 'user', 'other')
+        assert os.path.exists(self.keyring.journal_path)
+        assert self.keyring.get_password('system', 'user') == 'other'
+
+    def test_incomplete_record_ignored(self):
+        self.set_password('system', 'user', 'password')
+        with open(self.keyring.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write('["system", "user", "tor')
+        assert self.keyring.get_password('system', 'user') == 'password'
+
+    def test_append_after_incomplete_record(self):
+        self.set_password('system', 'user', 'password')
+        with open(self.keyring.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write('["system", "user", "tor')
+        other = self.init_keyring()
+        other.file_path = self.keyring.file_path
+        other.set_password('system', 'after', 'committed')
+        assert self.keyring.get_password('system', 'after') == 'committed'
+        assert self.keyring.get_password('system', 'user') == 'password'
+        other.delete_password('system', 'after')
+
+    def test_empty_username(self):
+        with pytest.raises(ValueError):
+            self.set_password('service1', '', 'password1')
+
+    def test_journal_folded_when_disabled(self):
+        self.set_password('system', 'user', 'password')
+        self.keyring.journal = False
+        self.set_password('system', 'other', 'password')
+        assert not os.path.exists(self.keyring.journal_path)
+        assert self.keyring.get_password('system', 'user') == 'password'
+
+
+@pytest.mark.skipif(
+    not file.EncryptedKeyring.viable,
+    reason="EncryptedKeyring backend not viable",
+)
+class TestJournaledEncryptedFileKeyring(TestJournaledFileKeyring):
+    @pytest.fixture(autouse=True)
+    def crypt_fixture(self, monkeypatch):
+        fake_getpass = mock.Mock(return_value='abcdef')
+        monkeypatch.setattr(getpass, 'getpass', fake_getpass)
+
+    def init_keyring(self):
+        keyring = file.EncryptedKeyring()
+        keyring.journal = True
+        return keyring
+
+    def test_changes_appended_to_journal(self):
+        self.set_password('system', 'user', 'password')
+        assert self.read_file() == ''
+
+    def test_journal_replayed(self):
+        self.set_password('system', 'user', 'password')
+        other = file.EncryptedKeyring()
+        other.file_path = self.keyring.file_path
+        assert other.get_password('system', 'user') == 'password'
+
+    def test_rekey(self):
+        self.set_password('system', 'user', 'password')
+        self.keyring.rekey('new password')
+        assert not os.path.exists(self.keyring.journal_path)
+        getpass.getpass.return_value = 'new password'
+        other = file.EncryptedKeyring()
+        other.file_path = self.keyring.file_path
+        assert other.get_password('system', 'user') == 'password'
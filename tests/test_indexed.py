@@ -0,0 +1,60 @@
+import pytest
+
+from keyrings.alt import file, indexed
+
+from .storage import EncryptedStorageKeyringTests, StorageKeyringTests
+
+
+class IndexedKeyringTests(StorageKeyringTests):
+    file_name = 'keyring.idx'
+
+    def test_many_entries(self):
+        passwords = {
+            (f'service{n % 7}', f'user{n}'): f'password{n}' for n in range(200)
+        }
+        self.keyring.set_passwords(passwords)
+        assert self.keyring.get_passwords(passwords) == passwords
+        assert self.keyring.get_password('service0', 'user1') is None
+        config = self.keyring._load_config()
+        assert len(config.options('service3')) == len(range(3, 200, 7))
+        self.keyring.delete_passwords(passwords)
+
+    def test_not_an_index(self):
+        with open(self.keyring.file_path, 'w', encoding='utf-8') as config_file:
+            config_file.write('[system]\nuser = cGFzc3dvcmQ=\n')
+        with pytest.raises(ValueError):
+            self.keyring.get_password('system', 'user')
+
+    def test_replaced_while_read(self, monkeypatch):
+        # Windows refuses to replace a file that is memory-mapped
+        monkeypatch.setattr(indexed.sys, 'platform', 'win32')
+        self.keyring.set_password('system', 'user', 'password')
+        other = self.init_keyring()
+        other.file_path = self.keyring.file_path
+        assert other.get_password('system', 'user') == 'password'
+        assert isinstance(other._load_config()._data, bytes)
+        self.keyring.set_password('system', 'user', 'changed')
+        assert other.get_password('system', 'user') == 'changed'
+
+
+class TestPlaintextIndexedKeyring(IndexedKeyringTests):
+    def init_keyring(self):
+        return indexed.PlaintextKeyring()
+
+
+@pytest.mark.skipif(
+    not file.EncryptedKeyring.viable,
+    reason="EncryptedKeyring backend not viable",
+)
+class TestEncryptedIndexedKeyring(EncryptedStorageKeyringTests, IndexedKeyringTests):
+    def init_keyring(self):
+        return indexed.EncryptedKeyring()
+
+
+@pytest.mark.skipif(
+    not file.EncryptedKeyring.viable,
+    reason="EncryptedKeyring backend not viable",
+)
+def test_ranked_below_file_keyrings():
+    assert indexed.PlaintextKeyring.priority < file.PlaintextKeyring.priority
+    assert indexed.EncryptedKeyring.priority < file.EncryptedKeyring.priority
@@ -1,9 +1,12 @@
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 import keyring.errors
 from keyring.backend import KeyringBackend
 
-from keyrings.alt import multi
+from keyrings.alt import file, multi
 
 
 class MultipartKeyringWrapperTestCase(unittest.TestCase):
@@ -60,3 +63,106 @@ class MultipartKeyringWrapperTestCase(unittest.TestCase):
 
         # should be able to read it back
         self.assertEqual(kr.get_password('s2', 'u2'), '0123456')
+
+    def testManifestSetInFirstPart(self):
+        wrapped_kr = self.MockKeyring()
+        kr = multi.MultipartKeyringWrapper(wrapped_kr, max_password_size=30)
+        kr.set_password('s2', 'u2', 'x' * 50)
+        self.assertEqual(
+            wrapped_kr.passwords,
+            {
+                's2u2': '{{parts=3 crc32=ac628a03}}xxxx',
+                's2u2{{part_1}}': 'x' * 30,
+                's2u2{{part_2}}': 'x' * 16,
+            },
+        )
+        # reads fetch exactly the parts, without probing for more
+        with mock.patch.object(
+            wrapped_kr, 'get_password', wraps=wrapped_kr.get_password
+        ) as get_password:
+            self.assertEqual(kr.get_password('s2', 'u2'), 'x' * 50)
+        self.assertEqual(get_password.call_count, 3)
+
+    def testShorterPasswordDeletesStaleParts(self):
+        wrapped_kr = self.MockKeyring()
+        kr = multi.MultipartKeyringWrapper(wrapped_kr, max_password_size=30)
+        kr.set_password('s2', 'u2', 'x' * 100)
+        kr.set_password('s2', 'u2', 'y' * 4)
+        self.assertEqual(list(wrapped_kr.passwords), ['s2u2'])
+        self.assertEqual(kr.get_password('s2', 'u2'), 'y' * 4)
+
+    def testPasswordOfMaxSizeInSinglePart(self):
+        wrapped_kr = self.MockKeyring()
+        kr = multi.MultipartKeyringWrapper(wrapped_kr, max_password_size=30)
+        kr.set_password('s2', 'u2', 'x' * 30)
+        self.assertEqual(wrapped_kr.passwords, {'s2u2': 'x' * 30})
+        self.assertEqual(kr.get_password('s2', 'u2'), 'x' * 30)
+
+    def testPasswordLikeManifest(self):
+        wrapped_kr = self.MockKeyring()
+        kr = multi.MultipartKeyringWrapper(wrapped_kr, max_password_size=60)
+        password = '{{parts=2 crc32=12345678}}abc'
+        kr.set_password('s2', 'u2', password)
+        self.assertEqual(
+            wrapped_kr.passwords,
+            {'s2u2': '{{parts=1 crc32=%s}}' % multi._checksum(password) + password},
+        )
+        self.assertEqual(kr.get_password('s2', 'u2'), password)
+        kr.set_password('s2', 'u2', password * 2)
+        self.assertEqual(len(wrapped_kr.passwords), 2)
+        self.assertEqual(kr.get_password('s2', 'u2'), password * 2)
+
+    def testDeletePassword(self):
+        wrapped_kr = self.MockKeyring()
+        kr = multi.MultipartKeyringWrapper(wrapped_kr, max_password_size=30)
+        kr.set_password('s2', 'u2', 'x' * 100)
+        with mock.patch.object(
+            wrapped_kr, 'delete_password', wraps=wrapped_kr.delete_password
+        ) as delete_password:
+            kr.delete_password('s2', 'u2')
+        self.assertEqual(wrapped_kr.passwords, {})
+        self.assertEqual(delete_password.call_count, 5)
+        with self.assertRaises(keyring.errors.PasswordDeleteError):
+            kr.delete_password('s2', 'u2')
+
+    def testPartsWithoutManifest(self):
+        # as stored before manifests were introduced
+        wrapped_kr = self.MockKeyring()
+        wrapped_kr.passwords.update({
+            's2u2': '01',
+            's2u2{{part_1}}': '23',
+            's2u2{{part_2}}': '4',
+        })
+        kr = multi.MultipartKeyringWrapper(wrapped_kr)
+        self.assertEqual(kr.get_password('s2', 'u2'), '01234')
+        kr.set_password('s2', 'u2', 'short')
+        self.assertEqual(list(wrapped_kr.passwords), ['s2u2'])
+        self.assertEqual(kr.get_password('s2', 'u2'), 'short')
+
+    def testMissingPart(self):
+        wrapped_kr = self.MockKeyring()
+        kr = multi.MultipartKeyringWrapper(wrapped_kr, max_password_size=30)
+        kr.set_password('s2', 'u2', 'x' * 50)
+        del wrapped_kr.passwords['s2u2{{part_2}}']
+        self.assertIsNone(kr.get_password('s2', 'u2'))
+
+    def testReplacedPart(self):
+        wrapped_kr = self.MockKeyring()
+        kr = multi.MultipartKeyringWrapper(wrapped_kr, max_password_size=30)
+        kr.set_password('s2', 'u2', 'x' * 50)
+        wrapped_kr.passwords['s2u2{{part_2}}'] = 'y' * 16
+        self.assertIsNone(kr.get_password('s2', 'u2'))
+
+    def testFindHidesParts(self):
+        with tempfile.TemporaryDirectory() as path:
+            wrapped_kr = file.PlaintextKeyring()
+            wrapped_kr.file_path = os.path.join(path, 'keyring.cfg')
+            kr = multi.MultipartKeyringWrapper(wrapped_kr, max_password_size=2)
+            kr.set_password('svc/prod/db', 'u1', '0123456')
+            kr.set_password('svc/prod/web', 'u2', '01')
+            kr.set_password('svc/test/db', 'u3', '0123')
+            self.assertEqual(
+                sorted(kr.find('svc/prod/')),
+                [('svc/prod/db', 'u1'), ('svc/prod/web', 'u2')],
+            )
+            self.assertEqual(list(kr.find('svc/', 'u3*')), [('svc/test/db', 'u3')])
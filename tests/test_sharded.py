@@ -0,0 +1,61 @@
+import glob
+import os
+
+import pytest
+
+from keyrings.alt import file, sharded
+
+from .storage import EncryptedStorageKeyringTests, StorageKeyringTests
+
+
+class ShardedKeyringTests(StorageKeyringTests):
+    file_name = 'keyring.d'
+
+    def shard_files(self):
+        return sorted(glob.glob(os.path.join(self.keyring.file_path, '*.*.cfg')))
+
+    def test_write_touches_one_shard(self):
+        passwords = {(f'service{n}', 'user'): 'password' for n in range(20)}
+        self.keyring.set_passwords(passwords)
+        before = {path: os.stat(path).st_ino for path in self.shard_files()}
+        assert len(before) > 1
+        self.keyring.set_password('service0', 'user', 'changed')
+        after = {path: os.stat(path).st_ino for path in self.shard_files()}
+        assert sum(before[path] != after[path] for path in before) == 1
+        self.keyring.delete_passwords(passwords)
+
+    def test_reshard(self):
+        passwords = {(f'service{n}', f'user{n}'): 'password' for n in range(20)}
+        self.keyring.set_passwords(passwords)
+        self.keyring.reshard(3)
+        assert len(self.shard_files()) == 3
+        assert self.keyring.get_passwords(passwords) == passwords
+        self.keyring.reshard(5)
+        assert self.keyring.get_passwords(passwords) == passwords
+        other = type(self.keyring)()
+        other.file_path = self.keyring.file_path
+        assert other.get_passwords(passwords) == passwords
+        self.keyring.delete_passwords(passwords)
+
+
+class TestPlaintextShardedKeyring(ShardedKeyringTests):
+    def init_keyring(self):
+        return sharded.PlaintextKeyring()
+
+
+@pytest.mark.skipif(
+    not file.EncryptedKeyring.viable,
+    reason="EncryptedKeyring backend not viable",
+)
+class TestEncryptedShardedKeyring(EncryptedStorageKeyringTests, ShardedKeyringTests):
+    def init_keyring(self):
+        return sharded.EncryptedKeyring()
+
+
+@pytest.mark.skipif(
+    not file.EncryptedKeyring.viable,
+    reason="EncryptedKeyring backend not viable",
+)
+def test_ranked_below_file_keyrings():
+    assert sharded.PlaintextKeyring.priority < file.PlaintextKeyring.priority
+    assert sharded.EncryptedKeyring.priority < file.EncryptedKeyring.priority
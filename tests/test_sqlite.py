@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from keyrings.alt import file, sqlite
+
+from .storage import EncryptedStorageKeyringTests, StorageKeyringTests
+
+
+class SQLiteKeyringTests(StorageKeyringTests):
+    file_name = 'keyring.sqlite'
+
+    def test_wal_mode(self):
+        self.set_password('system', 'user', 'password')
+        db = sqlite3.connect(self.keyring.file_path)
+        try:
+            (mode,) = db.execute('PRAGMA journal_mode').fetchone()
+        finally:
+            db.close()
+        assert mode == 'wal'
+
+    def test_batch(self):
+        passwords = {
+            ('system', 'user1'): 'password1',
+            ('other', 'user2'): 'password2',
+        }
+        self.keyring.set_passwords(passwords)
+        assert self.keyring.get_passwords(passwords) == passwords
+        self.keyring.delete_passwords(passwords)
+        assert self.keyring.get_password('system', 'user1') is None
+
+    def test_transaction(self):
+        self.set_password('system', 'user', 'password')
+        with pytest.raises(RuntimeError), self.keyring.transaction():
+            self.keyring.set_password('system', 'user', 'changed')
+            assert self.keyring.get_password('system', 'user') == 'changed'
+            raise RuntimeError()
+        assert self.keyring.get_password('system', 'user') == 'password'
+
+
+class TestPlaintextSQLiteKeyring(SQLiteKeyringTests):
+    def init_keyring(self):
+        return sqlite.PlaintextKeyring()
+
+
+@pytest.mark.skipif(
+    not file.EncryptedKeyring.viable,
+    reason="EncryptedKeyring backend not viable",
+)
+class TestEncryptedSQLiteKeyring(EncryptedStorageKeyringTests, SQLiteKeyringTests):
+    def init_keyring(self):
+        return sqlite.EncryptedKeyring()
+
+
+@pytest.mark.skipif(
+    not file.EncryptedKeyring.viable,
+    reason="EncryptedKeyring backend not viable",
+)
+def test_ranked_below_file_keyrings():
+    assert sqlite.PlaintextKeyring.priority < file.PlaintextKeyring.priority
+    assert sqlite.EncryptedKeyring.priority < file.EncryptedKeyring.priority
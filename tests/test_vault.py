@@ -0,0 +1,143 @@
+import getpass
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from keyrings.alt import file, file_base, vault
+
+from .storage import StorageKeyringTests
+
+pytestmark = pytest.mark.skipif(
+    not file.EncryptedKeyring.viable,
+    reason="EncryptedKeyring backend not viable",
+)
+
+
+class TestVaultKeyring(StorageKeyringTests):
+    file_name = 'keyring.vault'
+    file_keyring = file.EncryptedKeyring
+
+    @pytest.fixture(autouse=True)
+    def crypt_fixture(self, monkeypatch):
+        fake_getpass = mock.Mock(return_value='abcdef')
+        monkeypatch.setattr(getpass, 'getpass', fake_getpass)
+
+    def init_keyring(self):
+        return vault.EncryptedKeyring()
+
+    def other_keyring(self):
+        other = vault.EncryptedKeyring()
+        other.file_path = self.keyring.file_path
+        return other
+
+    def read_vault(self):
+        with open(self.keyring.file_path, encoding='utf-8') as vault_file:
+            return json.load(vault_file)
+
+    def write_vault(self, data):
+        with open(self.keyring.file_path, 'w', encoding='utf-8') as vault_file:
+            json.dump(data, vault_file)
+
+    def test_sealed(self):
+        self.set_password('system', 'user', 'password')
+        data = self.read_vault()
+        assert set(data) == {'scheme', 'version', 'kdf', 'salt', 'sealed'}
+        assert data['kdf'] == 'pbkdf2-sha256 iterations=1000'
+        with open(self.keyring.file_path, 'rb') as vault_file:
+            assert b'password' not in vault_file.read()
+
+    def test_unsealed_once(self, monkeypatch):
+        passwords = {(f'service{n}', 'user'): f'password{n}' for n in range(10)}
+        self.keyring.set_passwords(passwords)
+        other = self.other_keyring()
+        derive_key = mock.Mock(wraps=other._derive_key)
+        monkeypatch.setattr(other, '_derive_key', derive_key)
+        unseal = mock.Mock(wraps=other._unseal)
+        monkeypatch.setattr(other, '_unseal', unseal)
+        for (service, username), password in passwords.items():
+            assert other.get_password(service, username) == password
+        assert other.get_password('system', 'missing') is None
+        assert derive_key.call_count == 1
+        assert unseal.call_count == 1
+        # a change by another keyring is picked up without a new key
+        self.keyring.set_password('service0', 'user', 'changed')
+        assert other.get_password('service0', 'user') == 'changed'
+        assert derive_key.call_count == 1
+        assert unseal.call_count == 2
+        self.keyring.delete_passwords(passwords)
+
+    def test_wrong_password(self):
+        self.set_password('system', 'user', 'password')
+        getpass.getpass.return_value = 'wrong'
+        other = self.other_keyring()
+        with pytest.raises(ValueError):
+            other.get_password('system', 'user')
+        getpass.getpass.return_value = 'abcdef'
+        assert other.get_password('system', 'user') == 'password'
+
+    def test_header_tampered(self):
+        self.keyring.set_password('system', 'user', 'password')
+        data = self.read_vault()
+        data['kdf'] = 'pbkdf2-sha256 iterations=1001'
+        self.write_vault(data)
+        with pytest.raises(ValueError):
+            self.other_keyring().get_password('system', 'user')
+
+    def test_unsupported_version(self):
+        self.keyring.set_password('system', 'user', 'password')
+        data = self.read_vault()
+        data['version'] = '2.0'
+        self.write_vault(data)
+        with pytest.raises(ValueError):
+            self.other_keyring().get_password('system', 'user')
+
+    def test_interrupted_write(self, monkeypatch):
+        self.keyring.set_password('system', 'user', 'password')
+        before = self.read_vault()
+        monkeypatch.setattr(os, 'replace', mock.Mock(side_effect=OSError()))
+        with pytest.raises(OSError):
+            self.keyring.set_password('system', 'user', 'changed')
+        assert self.read_vault() == before
+        assert self.keyring.get_password('system', 'user') == 'password'
+
+    def test_transaction(self, monkeypatch):
+        seal = mock.Mock(wraps=self.keyring._seal)
+        monkeypatch.setattr(self.keyring, '_seal', seal)
+        with self.keyring.transaction():
+            self.keyring.set_password('system', 'user1', 'password1')
+            self.keyring.set_password('system', 'user2', 'password2')
+        assert seal.call_count == 1
+        assert self.other_keyring().get_passwords([
+            ('system', 'user1'),
+            ('system', 'user2'),
+        ]) == {('system', 'user1'): 'password1', ('system', 'user2'): 'password2'}
+        self.keyring.delete_passwords([('system', 'user1'), ('system', 'user2')])
+
+    @pytest.mark.skipif(file_base.fcntl is None, reason="Requires fcntl")
+    def test_unlocked_without_lock(self, monkeypatch):
+        def check_unlocked():
+            # the lock is free for another holder
+            with open(self.keyring.lock_path, 'a') as lock:
+                file_base.fcntl.flock(
+                    lock, file_base.fcntl.LOCK_EX | file_base.fcntl.LOCK_NB
+                )
+
+        self.keyring.set_password('system', 'user', 'password')
+        other = self.other_keyring()
+        getpass.getpass.reset_mock()
+        getpass.getpass.side_effect = lambda *args: check_unlocked() or 'abcdef'
+        derive = other._derive_key
+        derive_key = mock.Mock(wraps=lambda *args: check_unlocked() or derive(*args))
+        monkeypatch.setattr(other, '_derive_key', derive_key)
+        other.set_password('system', 'user', 'changed')
+        assert derive_key.call_count == 1
+        other.keyring_key = 'new password'
+        other.set_password('system', 'user', 'password')
+        assert derive_key.call_count == 2
+        assert getpass.getpass.call_count == 1
+
+
+def test_ranked_below_file_keyring():
+    assert vault.EncryptedKeyring.priority < file.EncryptedKeyring.priority